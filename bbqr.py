@@ -23,7 +23,9 @@
 # This code an adaptation of Coinkite's BBQr python implementation for Krux environment
 # https://github.com/coinkite/BBQr
 
-import gc
+import zlib
+import binascii
+from base64 import b32decode, b32encode
 
 # BBQR
 KNOWN_ENCODINGS = {"H", "2", "Z"}
@@ -33,55 +35,37 @@ KNOWN_ENCODINGS = {"H", "2", "Z"}
 # U='Unicode Text', X='Executable', B='Binary'
 KNOWN_FILETYPES = {"P", "T", "J", "U"}
 
-BBQR_ALWAYS_COMPRESS_THRESHOLD = 5000  # bytes
+BBQR_PREFIX_LENGTH = 8
 
-B32CHARS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ234567"
-assert len(B32CHARS) == 32
+# Part index and total are 2 base36 digits
+BBQR_MAX_PARTS = 1295
 
-BBQR_PREFIX_LENGTH = 8
 
-QR_CAPACITY_ALPHANUMERIC = [
-    25,
-    47,
-    77,
-    114,
-    154,
-    195,
-    224,
-    279,
-    335,
-    395,
-    468,
-    535,
-    619,
-    667,
-    758,
-    854,
-    938,
-    1046,
-    1153,
-    1249,
-    1352,
-    1460,
-    1588,
-    1704,
-    1853,
-    1990,
-    2132,
-    2232,
-    2369,
-    2520,
-    2677,
-    2840,
-    3009,
-    3183,
-    3351,
-    3537,
-    3729,
-    3927,
-    4087,
-    4296,
-]
+def find_min_num_parts(data_length, qr_capacity):
+    """Number of parts and part size for a payload of data_length characters
+    in QR codes holding up to qr_capacity alphanumeric characters each
+    """
+    max_part_size = qr_capacity - BBQR_PREFIX_LENGTH
+    if data_length < max_part_size:
+        return 1, data_length
+    # Round max_part_size to the nearest lower multiple of 8
+    max_part_size = (max_part_size // 8) * 8
+    # Calculate the number of parts required (rounded up)
+    num_parts = (data_length + max_part_size - 1) // max_part_size
+    # Calculate the optimal part size
+    part_size = data_length // num_parts
+    # Round to the nearest higher multiple of 8
+    part_size = ((part_size + 7) // 8) * 8
+    # Check if the part size is within the limits
+    if part_size > max_part_size:
+        num_parts += 1
+        part_size = data_length // num_parts
+        # Round to the nearest higher multiple of 8 again
+        part_size = ((part_size + 7) // 8) * 8
+    if num_parts > BBQR_MAX_PARTS:
+        raise ValueError("Too many BBQR parts")
+    return num_parts, part_size
+
 
 class BBQrCode:
     """A BBQr code, containing the data, encoding, and file type"""
@@ -98,43 +82,14 @@ class BBQrCode:
         self.encoding = encoding
         self.file_type = file_type
 
-    def find_min_num_parts(self, max_width):
-        qr_capacity = self.max_qr_bytes(max_width)
-        data_length = len(self.payload)
-        max_part_size = qr_capacity - BBQR_PREFIX_LENGTH
-        if data_length < max_part_size:
-            return 1, data_length
-        # Round max_part_size to the nearest lower multiple of 8
-        max_part_size = (max_part_size // 8) * 8
-        # Calculate the number of parts required (rounded up)
-        num_parts = (data_length + max_part_size - 1) // max_part_size
-        # Calculate the optimal part size
-        part_size = data_length // num_parts
-        # Round to the nearest higher multiple of 8
-        part_size = ((part_size + 7) // 8) * 8
-        # Check if the part size is within the limits
-        if part_size > max_part_size:
-            num_parts += 1
-            part_size = data_length // num_parts
-            # Round to the nearest higher multiple of 8 again
-            part_size = ((part_size + 7) // 8) * 8
-        return num_parts, part_size
-
-    def max_qr_bytes(self, max_width):
-        """Calculates the maximum length, in bytes, a QR code of a given size can store"""
-        # Given qr_size = 17 + 4 * version + 2 * frame_size
-        max_width -= 2  # Subtract frame width
-        qr_version = (max_width - 17) // 4
-        capacity_list = QR_CAPACITY_ALPHANUMERIC
+    def find_min_num_parts(self, qr_capacity):
+        """Number of parts and part size for QR codes holding up to
+        qr_capacity alphanumeric characters each
+        """
+        return find_min_num_parts(len(self.payload), qr_capacity)
 
-        try:
-            return capacity_list[qr_version - 1]
-        except:
-            # Limited to version 20
-            return capacity_list[-1]
-        
-    def to_qr_code(self, max_width):
-        num_parts, part_size = self.find_min_num_parts(max_width)
+    def to_qr_code(self, qr_capacity):
+        num_parts, part_size = self.find_min_num_parts(qr_capacity)
         part_index = 0
         while True:
             header = "B$%s%s%s%s" % (
@@ -193,14 +148,15 @@ def parse_bbqr(data):
     return data[8:], part_index, part_total
 
 
-def deflate_compress(data):
-    """Compresses the given data using deflate module"""
+def deflate_compress(data, level=zlib.Z_DEFAULT_COMPRESSION, mem_level=zlib.DEF_MEM_LEVEL,
+                     strategy=zlib.Z_DEFAULT_STRATEGY):
+    """Compresses the given data using deflate module, zlib's defaults unless given"""
     try:
         import deflate
         from io import BytesIO
 
         stream = BytesIO()
-        with deflate.DeflateIO(stream) as d:
+        with deflate.DeflateIO(stream, level, mem_level, strategy) as d:
             d.write(data)
         return stream.getvalue()
     except Exception as e:
@@ -220,113 +176,118 @@ def deflate_decompress(data):
         raise ValueError("Error decompressing BBQR")
 
 
-def decode_bbqr(parts, encoding, file_type):
-    """Decodes the given data as BBQR, returning the decoded data"""
+def decode_bbqr_part(part, encoding):
+    """Decodes the content of a single BBQR part to bytes"""
 
     if encoding == "H":
-        from binascii import unhexlify
+        try:
+            return bytes.fromhex(part)
+        except ValueError:
+            raise ValueError("Invalid hex data")
+    return base32_decode(part)
+
 
-        data_bytes = bytearray()
-        for _, part in sorted(parts.items()):
-            data_bytes.extend(unhexlify(part))
-        return bytes(data_bytes)
+def decode_bbqr_data(data_bytes, encoding, file_type):
+    """Decompresses and decodes the joined bytes of all parts"""
 
-    binary_data = b""
-    for _, part in sorted(parts.items()):
-        padding = (8 - (len(part) % 8)) % 8
-        padded_part = part + (padding * "=")
-        binary_data += base32_decode_stream(padded_part)
+    if encoding == "H":
+        return data_bytes
 
     if encoding == "Z":
-        if file_type in "JU":
-            return deflate_decompress(binary_data).decode("utf-8")
-        return deflate_decompress(binary_data)
+        data_bytes = deflate_decompress(data_bytes)
+    return decode_bbqr_file(data_bytes, file_type)
+
+
+def decode_bbqr_file(data_bytes, file_type):
+    """Decodes the decompressed bytes as text for the text file types"""
+
     if file_type in "JU":
-        return binary_data.decode("utf-8")
-    return binary_data
+        return data_bytes.decode("utf-8")
+    return data_bytes
 
 
-def encode_bbqr(data, encoding="Z", file_type="P"):
-    """Encodes the given data as BBQR, returning the encoded data and format"""
+class BBQrInflater:
+    """Decompresses the bytes of a "Z" BBQR in order, as they become available"""
 
-    if encoding == "H":
-        from binascii import hexlify
+    def __init__(self):
+        self.decompressor = zlib.decompressobj(wbits=-10)
+        self.chunks = []
 
-        data = hexlify(data).decode()
-        return BBQrCode(data.upper(), encoding, file_type)
+    def feed(self, data_bytes):
+        """Decompresses the next bytes of the stream"""
+        try:
+            self.chunks.append(self.decompressor.decompress(data_bytes))
+        except zlib.error:
+            raise ValueError("Error decompressing BBQR")
+
+    def finish(self):
+        """Returns all the decompressed bytes, once the whole stream was fed"""
+        try:
+            self.chunks.append(self.decompressor.flush())
+        except zlib.error:
+            raise ValueError("Error decompressing BBQR")
+        if not self.decompressor.eof:
+            raise ValueError("Error decompressing BBQR")
+        return b"".join(self.chunks)
+
+
+def decode_bbqr(parts, encoding, file_type):
+    """Decodes the given data as BBQR, returning the decoded data"""
+
+    data_bytes = b"".join(
+        decode_bbqr_part(part, encoding) for _, part in sorted(parts.items())
+    )
+    return decode_bbqr_data(data_bytes, encoding, file_type)
+
+
+def encode_bbqr(data, encoding="Z", file_type="P", compressed=None):
+    """Encodes the given data as BBQR, returning the encoded data and format
+
+    compressed, when given, is used as the "Z" payload instead of compressing
+    the data with the default settings.
+    """
+
+    data = data.encode("utf-8") if isinstance(data, str) else data
+
+    if encoding == "H":
+        return BBQrCode(data.hex().upper(), encoding, file_type)
 
     if encoding == "Z":
-        if len(data) > BBQR_ALWAYS_COMPRESS_THRESHOLD:
-            # RAM won't be enough to have both compressed and not compressed data
-            # It will always be beneficial to compress large data
-            data = deflate_compress(data)
+        # Compress once, and only keep it if it is beneficial
+        cmp = deflate_compress(data) if compressed is None else compressed
+        if len(cmp) >= len(data):
+            encoding = "2"
         else:
-            # Check if compression is beneficial
-            cmp = deflate_compress(data)
-            if len(cmp) >= len(data):
-                encoding = "2"
-            else:
-                encoding = "Z"
-                data = cmp
+            data = cmp
+        del cmp
 
-    data = data.encode("utf-8") if isinstance(data, str) else data
-    gc.collect()
-    return BBQrCode("".join(base32_encode_stream(data)), encoding, file_type)
+    return BBQrCode(base32_encode(data), encoding, file_type)
 
 
 # Base 32 encoding/decoding, used in BBQR only
 
 
-def base32_decode_stream(encoded_str):
-    """Decodes a Base32 string"""
-    base32_index = {ch: index for index, ch in enumerate(B32CHARS)}
-
-    # Strip padding
+def base32_decode(encoded_str):
+    """Decodes a Base32 string, padded or not"""
     encoded_str = encoded_str.rstrip("=")
+    padding = (8 - (len(encoded_str) % 8)) % 8
+    try:
+        return b32decode(encoded_str + padding * "=")
+    except binascii.Error:
+        raise ValueError("Invalid Base32 data")
+
+
+def base32_length(size):
+    """Length of size bytes encoded as Base32, without padding"""
+    return (size * 8 + 4) // 5
+
 
-    buffer = 0
-    bits_left = 0
-    decoded_bytes = bytearray()
-
-    for char in encoded_str:
-        if char not in base32_index:
-            raise ValueError("Invalid Base32 character: %s" % char)
-        index = base32_index[char]
-        buffer = (buffer << 5) | index
-        bits_left += 5
-
-        while bits_left >= 8:
-            bits_left -= 8
-            decoded_bytes.append((buffer >> bits_left) & 0xFF)
-            buffer &= (1 << bits_left) - 1  # Keep only the remaining bits
-
-    return bytes(decoded_bytes)
-
-
-def base32_encode_stream(data, add_padding=False):
-    """A streaming base32 encoder"""
-    buffer = 0
-    bits_left = 0
-
-    for byte in data:
-        buffer = (buffer << 8) | byte
-        bits_left += 8
-
-        while bits_left >= 5:
-            bits_left -= 5
-            yield B32CHARS[(buffer >> bits_left) & 0x1F]
-            buffer &= (1 << bits_left) - 1  # Keep only the remaining bits
-
-    if bits_left > 0:
-        buffer <<= 5 - bits_left
-        yield B32CHARS[buffer & 0x1F]
-
-    # Padding
-    if add_padding:
-        encoded_length = (len(data) * 8 + 4) // 5
-        padding_length = (8 - (encoded_length % 8)) % 8
-        for _ in range(padding_length):
-            yield "="
+def base32_encode(data):
+    """Encodes bytes as a Base32 string, without padding"""
+    encoded = b32encode(data)
+    length = base32_length(len(data))
+    # Decode straight from the unpadded view, without another copy of the bytes
+    return str(memoryview(encoded)[:length], "ascii")
 
 
 def int2base36(n):
@@ -0,0 +1,69 @@
+import zlib
+from itertools import product
+from concurrent.futures import ProcessPoolExecutor
+
+from bbqr import encode_bbqr, deflate_compress, find_min_num_parts, base32_length
+
+# deflate settings tried by the smallest output search, the window stays
+# at the 10 bits signers decompress with
+DEFLATE_LEVELS = (6, 7, 8, 9)
+DEFLATE_MEM_LEVELS = (8, 9)
+DEFLATE_STRATEGIES = (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED, zlib.Z_RLE, zlib.Z_FIXED)
+
+# payload the worker processes compress, sent once per worker
+worker_data = None
+
+
+def set_worker_data(data):
+    global worker_data
+    worker_data = data
+
+
+def compress(settings):
+    return deflate_compress(worker_data, *settings)
+
+
+def smallest_bbqr(data, qr_capacity, file_type="P", max_workers=None):
+    """BBQR of the data with the deflate settings that give the fewest parts
+    of at most qr_capacity characters, fewest bytes on ties.
+
+    Every combination of DEFLATE_LEVELS, DEFLATE_MEM_LEVELS and
+    DEFLATE_STRATEGIES is tried on a process pool. Returns the BBQrCode and
+    a report comparing it with the default settings.
+    """
+    data = data.encode("utf-8") if isinstance(data, str) else data
+    default_settings = (zlib.Z_DEFAULT_COMPRESSION, zlib.DEF_MEM_LEVEL, zlib.Z_DEFAULT_STRATEGY)
+    candidates = [default_settings] + list(product(DEFLATE_LEVELS, DEFLATE_MEM_LEVELS, DEFLATE_STRATEGIES))
+
+    # workers send the compressed bytes back, only the shortest is kept so
+    # the winner is never compressed again
+    with ProcessPoolExecutor(max_workers, initializer=set_worker_data, initargs=(data,)) as pool:
+        results = pool.map(compress, candidates)
+        best_compressed = next(results)
+        best_settings, default_len = default_settings, len(best_compressed)
+        for settings, compressed in zip(candidates[1:], results):
+            if len(compressed) < len(best_compressed):
+                best_settings, best_compressed = settings, compressed
+    best_len = len(best_compressed)
+
+    # the part count only grows with the compressed length, the shortest has the fewest
+    best = encode_bbqr(data, "Z", file_type, best_compressed)
+    del best_compressed
+
+    parts, _ = best.find_min_num_parts(qr_capacity)
+    try:
+        # the default settings give a "2" payload when compression doesn't help
+        default_parts, _ = find_min_num_parts(base32_length(min(default_len, len(data))), qr_capacity)
+    except ValueError:
+        # too many parts with the default settings
+        default_parts = None
+    report = {
+        "level": best_settings[0],
+        "mem_level": best_settings[1],
+        "strategy": best_settings[2],
+        "encoding": best.encoding,
+        "bytes_saved": default_len - best_len,
+        "parts": parts,
+        "parts_saved": None if default_parts is None else default_parts - parts,
+    }
+    return best, report
@@ -0,0 +1,28 @@
+"""
+Timing of the foundation CRC32 backend against the table implementation:
+
+    python -m benchmarks.bench_crc32
+"""
+import os
+import timeit
+
+from foundation.crc32 import crc32, crc32_table
+
+SIZES = (64, 1024, 64 * 1024, 1024 * 1024)
+
+
+def bench(func, data):
+    runs, total = timeit.Timer(lambda: func(data)).autorange()
+    return total / runs
+
+
+def main():
+    print(f"{'bytes':>10} {'table ms':>10} {'crc32 ms':>10} {'speedup':>8}")
+    for size in SIZES:
+        data = os.urandom(size)
+        table, native = bench(crc32_table, data), bench(crc32, data)
+        print(f"{size:>10} {table * 1000:>10.3f} {native * 1000:>10.3f} {table / native:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,15 +4,19 @@ import zlib
 
 class DeflateIO:
 
-    def __init__(self, stream) -> None:
+    def __init__(self, stream, level=zlib.Z_DEFAULT_COMPRESSION, mem_level=zlib.DEF_MEM_LEVEL,
+                 strategy=zlib.Z_DEFAULT_STRATEGY) -> None:
         self.stream = stream
         self.data = stream.read()
+        self.level = level
+        self.mem_level = mem_level
+        self.strategy = strategy
 
     def read(self):
         return zlib.decompress(self.data, wbits=-10)
 
     def write(self, input_data):
-        compressor = zlib.compressobj(wbits=-10)
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, -10, self.mem_level, self.strategy)
         compressed_data = compressor.compress(input_data)
         compressed_data += compressor.flush()
         self.stream.seek(0)  # Ensure we overwrite the stream from the beginning
@@ -5,11 +5,20 @@
 # Licensed under the "BSD-2-Clause Plus Patent License"
 #
 
-from .utils import crc32_bytes, partition
+from operator import add
+
+from .utils import crc32_bytes
 
 BYTEWORDS = 'ableacidalsoapexaquaarchatomauntawayaxisbackbaldbarnbeltbetabiasbluebodybragbrewbulbbuzzcalmcashcatschefcityclawcodecolacookcostcruxcurlcuspcyandarkdatadaysdelidicedietdoordowndrawdropdrumdulldutyeacheasyechoedgeepicevenexamexiteyesfactfairfernfigsfilmfishfizzflapflewfluxfoxyfreefrogfuelfundgalagamegeargemsgiftgirlglowgoodgraygrimgurugushgyrohalfhanghardhawkheathelphighhillholyhopehornhutsicedideaidleinchinkyintoirisironitemjadejazzjoinjoltjowljudojugsjumpjunkjurykeepkenokeptkeyskickkilnkingkitekiwiknoblamblavalazyleaflegsliarlimplionlistlogoloudloveluaulucklungmainmanymathmazememomenumeowmildmintmissmonknailnavyneednewsnextnoonnotenumbobeyoboeomitonyxopenovalowlspaidpartpeckplaypluspoempoolposepuffpumapurrquadquizraceramprealredorichroadrockroofrubyruinrunsrustsafesagascarsetssilkskewslotsoapsolosongstubsurfswantacotasktaxitenttiedtimetinytoiltombtoystriptunatwinuglyundouniturgeuservastveryvetovialvibeviewvisavoidvowswallwandwarmwaspwavewaxywebswhatwhenwhizwolfworkyankyawnyellyogayurtzapszerozestzinczonezoom'
 WORD_ARRAY = None
 
+# Lookup tables for bulk encoding/decoding: byte -> word and word -> byte,
+# for both the full (4-letter) and the minimal (first + last letter) forms.
+WORDS = [BYTEWORDS[i * 4:i * 4 + 4] for i in range(256)]
+MINIMAL_WORDS = [w[0] + w[3] for w in WORDS]
+WORD_VALUES = {w: i for i, w in enumerate(WORDS)}
+MINIMAL_WORD_VALUES = {w: i for i, w in enumerate(MINIMAL_WORDS)}
+
 def decode_word(word, word_len):
     global WORD_ARRAY
     global BYTEWORDS
@@ -64,12 +73,7 @@ def get_minimal_word(index):
     return BYTEWORDS[byteword_offset] + BYTEWORDS[byteword_offset + 3]
 
 def encode(buf, separator):
-    words = []
-    for i in range(len(buf)):
-        byte = buf[i]
-        words.append(get_word(byte))
-
-    return separator.join(words)
+    return separator.join([WORDS[byte] for byte in buf])
 
 def add_crc(buf):
     crc_buf = crc32_bytes(buf)
@@ -80,25 +84,29 @@ def encode_with_separator(buf, separator):
     return encode(crc_buf, separator)
 
 def encode_minimal(buf):
-    result = ''
-
     crc_buf = add_crc(buf)
-    for i in range(len(crc_buf)):
-        byte = crc_buf[i]
-        result += get_minimal_word(byte)
-
-    return result
+    return ''.join([MINIMAL_WORDS[byte] for byte in crc_buf])
 
 def decode(s, separator, word_len):
-    buf = bytearray()
+    # Bytewords are plain ASCII, anything else can't be valid (and could
+    # change length when lowered).
+    if not s.isascii():
+        raise ValueError('Invalid Bytewords.')
+    s = s.lower()
 
     if word_len == 4:
         words = s.split(separator)
+        table = WORD_VALUES
     else:
-        words = partition(s, 2)
+        if len(s) % 2 != 0:
+            raise ValueError('Invalid Bytewords.')
+        words = map(add, s[0::2], s[1::2])
+        table = MINIMAL_WORD_VALUES
 
-    for word in words:
-        buf.append(decode_word(word, word_len))
+    try:
+        buf = bytearray(map(table.__getitem__, words))
+    except KeyError:
+        raise ValueError('Invalid Bytewords.')
 
     if len(buf) < 5:
         raise ValueError('Invalid Bytewords.') 
@@ -112,6 +120,19 @@ def decode(s, separator, word_len):
 
     return body
 
+# Decodes only the first `count` bytes of a minimal Bytewords string, without
+# validating the checksum. Only meant for peeking at headers.
+def decode_minimal_prefix(s, count):
+    s = s[:count * 2]
+    if not s.isascii() or len(s) % 2 != 0:
+        raise ValueError('Invalid Bytewords.')
+    s = s.lower()
+
+    try:
+        return bytes(map(MINIMAL_WORD_VALUES.__getitem__, map(add, s[0::2], s[1::2])))
+    except KeyError:
+        raise ValueError('Invalid Bytewords.')
+
 Bytewords_Style_standard = 1
 Bytewords_Style_uri = 2
 Bytewords_Style_minimal = 3
@@ -7,12 +7,17 @@
 
 from .constants import MAX_UINT32
 
+# zlib's CRC32 uses the same polynomial (0xEDB88320) and output as the table
+# implementation below, at C speed. crc32_table is kept as the reference
+# implementation for the tests and benchmark.
+from zlib import crc32
+
 def bit_length(n):
     return len(bin(abs(n))) - 2
 
 TABLE = None
 
-def crc32(buf):
+def crc32_table(buf):
     # Lazily instantiate CRC table
     global TABLE
     if TABLE == None:
@@ -6,7 +6,7 @@
 #
 
 from .fountain_utils import choose_fragments, contains, is_strict_subset, set_difference
-from .utils import join_lists, join_bytes, crc32_int, xor_with, take_first
+from .utils import join_lists, join_bytes, crc32_int, xor_bytes, take_first
 
 class InvalidPart(Exception):
     pass
@@ -22,7 +22,8 @@ class FountainDecoder:
         
         @classmethod
         def from_encoder_part(cls, p):
-            return cls(choose_fragments(p.seq_num, p.seq_len, p.checksum), p.data[:])
+            # Part data is immutable (bytes), reductions always build new data
+            return cls(choose_fragments(p.seq_num, p.seq_len, p.checksum), p.data)
 
         def indexes(self):
             return self.indexes
@@ -38,7 +39,9 @@ class FountainDecoder:
             return list(self.indexes)[0]
 
     # FountainDecoder
-    def __init__(self):
+    # `max_mixed_bytes` caps the memory held by mixed parts waiting to be
+    # reduced, None means no limit.
+    def __init__(self, max_mixed_bytes = None):
         self.received_part_indexes = set()
         self.last_part_indexes = None
         self.processed_parts_count = 0
@@ -47,9 +50,20 @@ class FountainDecoder:
         self.expected_fragment_len = None
         self.expected_message_len = None
         self.expected_checksum = None
+        # Resolved fragments are written straight into this buffer, and the
+        # simple parts keep a view of their slot instead of a copy.
+        self.message_buffer = None
+        self.message_view = None
         self.simple_parts = {}
         self.mixed_parts = {}
         self.queued_parts = []
+        # Telemetry: GF(2) basis of the received index sets (keyed by highest
+        # index) tracks how many independent parts we have.
+        self.rank_basis = {}
+        self.duplicate_parts_count = 0
+        self.useless_parts_count = 0
+        self.max_mixed_bytes = max_mixed_bytes
+        self.evicted_parts_count = 0
 
     def expected_part_count(self):
         return len(self.expected_part_indexes)  # TODO: Handle None?
@@ -76,8 +90,62 @@ class FountainDecoder:
             return 1
         if self.expected_part_indexes == None:
             return 0
-        estimated_input_parts = self.expected_part_count() * .7
-        return min(0.99, len(self.received_part_indexes) / estimated_input_parts)
+        return min(0.99, self.rank() / self.expected_part_count())
+
+    # Number of linearly independent parts received so far. The message can be
+    # recovered once this reaches the expected part count.
+    def rank(self):
+        return len(self.rank_basis)
+
+    def mixed_parts_count(self):
+        return len(self.mixed_parts)
+
+    def mixed_parts_bytes(self):
+        if self.expected_fragment_len == None:
+            return 0
+        return len(self.mixed_parts) * self.expected_fragment_len
+
+    # Drop the least useful mixed parts until they fit in `max_mixed_bytes`:
+    # the highest degree first and, among those, the oldest unreduced.
+    def evict_mixed_parts(self):
+        if self.max_mixed_bytes == None or self.mixed_parts_bytes() <= self.max_mixed_bytes:
+            return
+
+        max_count = self.max_mixed_bytes // self.expected_fragment_len
+        excess = len(self.mixed_parts) - max_count
+        # Dicts keep insertion order and sorting is stable, so ties stay oldest first
+        victims = sorted(self.mixed_parts.values(), key=lambda p: len(p.indexes), reverse=True)[:excess]
+        for p in victims:
+            del self.mixed_parts[p.indexes]
+        self.evicted_parts_count += excess
+
+        # The evicted parts no longer count towards the rank
+        self.rank_basis = {}
+        for index in self.received_part_indexes:
+            self.add_to_rank((index,))
+        for indexes in self.mixed_parts:
+            self.add_to_rank(indexes)
+
+    def add_to_rank(self, indexes):
+        mask = 0
+        for index in indexes:
+            mask |= 1 << index
+
+        while mask:
+            top = mask.bit_length() - 1
+            basis = self.rank_basis.get(top)
+            if basis == None:
+                self.rank_basis[top] = mask
+                return True
+            mask ^= basis
+
+        # The part is a combination of the ones we already have
+        return False
+
+    def is_duplicate_part(self, p):
+        if p.is_simple():
+            return contains(self.received_part_indexes, p.index())
+        return p.indexes in self.mixed_parts
 
     def receive_part(self, encoder_part):
         # Don't process the part if we're already done
@@ -88,15 +156,28 @@ class FountainDecoder:
         if not self.validate_part(encoder_part):
             return False
 
-        # Add this part to the queue
         p = FountainDecoder.Part.from_encoder_part(encoder_part)
         self.last_part_indexes = p.indexes
+
+        # Don't process parts we already hold
+        if self.is_duplicate_part(p):
+            self.duplicate_parts_count += 1
+            self.processed_parts_count += 1
+            return True
+
+        if not self.add_to_rank(p.indexes):
+            self.useless_parts_count += 1
+
+        # Add this part to the queue
         self.enqueue(p)
 
         # Process the queue until we're done or the queue is empty
         while not self.is_complete() and len(self.queued_parts) != 0:
             self.process_queue_item()
 
+        if not self.is_complete():
+            self.evict_mixed_parts()
+
         # Keep track of how many parts we've processed
         self.processed_parts_count += 1
 
@@ -148,7 +229,7 @@ class FountainDecoder:
             # The new fragments in the revised part are `a` - `b`.
             new_indexes = set_difference(a.indexes, b.indexes)
             # The new data in the revised part are `a` XOR `b`
-            new_data = xor_with(bytearray(a.data), b.data)
+            new_data = xor_bytes(a.data, b.data)
             return self.Part(new_indexes, new_data)
         else:
             # `a` is not reducable by `b`, so return a
@@ -160,24 +241,19 @@ class FountainDecoder:
         if contains(self.received_part_indexes, fragment_index):
             return
 
-        # Record this part
+        # Record this part, writing its fragment into the message buffer
+        fragment_len = self.expected_fragment_len
+        start = fragment_index * fragment_len
+        fragment = self.message_view[start:start + fragment_len]
+        fragment[:] = p.data
+        p = self.Part(p.indexes, fragment)
         self.simple_parts[p.indexes] = p
         self.received_part_indexes.add(fragment_index)
 
         # If we've received all the parts
         if self.received_part_indexes == self.expected_part_indexes:
-            # Reassemble the message from its fragments
-            sorted_parts = []
-            for value in self.simple_parts.values():
-                sorted_parts.append(value)
-
-            sorted_parts.sort(key=lambda a: a.index())
-
-            fragments = []
-            for part in sorted_parts:
-                fragments.append(part.data)
-
-            message = self.join_fragments(fragments, self.expected_message_len)
+            # The fragments are already in place, just drop the padding
+            message = self.message_view[:self.expected_message_len]
 
             # Verify the message checksum and note success or failure
             checksum = crc32_int(message)
@@ -192,9 +268,8 @@ class FountainDecoder:
 
     def process_mixed_part(self, p):
         # Don't process duplicate parts
-        for r in self.mixed_parts.values():
-            if r == p.indexes:
-                return
+        if p.indexes in self.mixed_parts:
+            return
 
         # Reduce this part by all the others
         p2 = p  # TODO: Does this need to make a copy of p?
@@ -204,6 +279,10 @@ class FountainDecoder:
         for r in self.mixed_parts.values():
             p2 = self.reduce_part_by_part(p2, r)
 
+        # If the part reduced to nothing, it carries no new information
+        if len(p2.indexes) == 0:
+            return
+
         # If the part is now simple
         if p2.is_simple():
             # Add it to the queue
@@ -225,6 +304,8 @@ class FountainDecoder:
             self.expected_message_len = p.message_len
             self.expected_checksum = p.checksum
             self.expected_fragment_len = len(p.data)
+            self.message_buffer = bytearray(p.seq_len * self.expected_fragment_len)
+            self.message_view = memoryview(self.message_buffer)
         else:
             # If this part's values don't match the first part's values, throw away the part
             if self.expected_part_count() != p.seq_len:
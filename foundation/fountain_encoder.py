@@ -8,7 +8,7 @@
 import math
 from .cbor_lite import CBORDecoder, CBOREncoder
 from .fountain_utils import choose_fragments
-from .utils import split, crc32_int, xor_into, data_to_hex
+from .utils import split, crc32_int, data_to_hex
 from .constants import MAX_UINT32, MAX_UINT64
 
 class InvalidHeader(Exception):
@@ -90,6 +90,8 @@ class FountainEncoder:
         self.fragment_len = FountainEncoder.find_nominal_fragment_length(self.message_len, min_fragment_len, max_fragment_len)
         self.fragments = FountainEncoder.partition_message(message, self.fragment_len)
         self.seq_num = first_seq_num
+        # Fragments as integers, so mixing is a few big-int XORs (created lazily)
+        self.fragment_ints = None
     
     @staticmethod
     def find_nominal_fragment_length(message_len, min_fragment_len, max_fragment_len):
@@ -140,13 +142,30 @@ class FountainEncoder:
     def next_part(self):
         self.seq_num += 1
         self.seq_num = self.seq_num % MAX_UINT32  # wrap at period 2^32
-        indexes = choose_fragments(self.seq_num, self.seq_len(), self.checksum)
-        mixed = self.mix(indexes)
-        data = bytes(mixed)
-        return Part(self.seq_num, self.seq_len(), self.message_len, self.checksum, data)
+        return self.part(self.seq_num)
+
+    # The next `count` parts, same as calling `next_part` `count` times
+    def next_parts(self, count):
+        parts = []
+        for _ in range(count):
+            parts.append(self.next_part())
+        return parts
+
+    # The part with the given sequence number, without changing the encoder state
+    def part(self, seq_num):
+        indexes = choose_fragments(seq_num, self.seq_len(), self.checksum)
+        data = self.mix(indexes)
+        return Part(seq_num, self.seq_len(), self.message_len, self.checksum, data)
+
+    # All the parts needed to relay the message (the "systematic" ones), followed by
+    # `redundant_count` mixed parts, without changing the encoder state
+    def schedule(self, redundant_count):
+        return [self.part(seq_num) for seq_num in range(1, self.seq_len() + redundant_count + 1)]
 
     def mix(self, indexes):
-        result = [0] * self.fragment_len
+        if self.fragment_ints == None:
+            self.fragment_ints = [int.from_bytes(fragment, 'big') for fragment in self.fragments]
+        result = 0
         for index in indexes:
-            xor_into(result, self.fragments[index])
-        return result
+            result ^= self.fragment_ints[index]
+        return result.to_bytes(self.fragment_len, 'big')
@@ -5,11 +5,18 @@
 # Licensed under the "BSD-2-Clause Plus Patent License"
 #
 
+from bisect import insort
+from functools import lru_cache
+
 from .random_sampler import RandomSampler
 from .utils import int_to_bytes
 from .xoshiro256 import Xoshiro256
 
-# Fisher-Yates shuffle
+# Number of `choose_fragments` results kept around, shared by the encoder and
+# the decoder. A looping sender repeats the same parts over and over.
+FRAGMENTS_CACHE_SIZE = 4096
+
+# Fisher-Yates shuffle (reference implementation)
 def shuffled(items, rng):
     remaining = items
     result = []
@@ -20,30 +27,55 @@ def shuffled(items, rng):
 
     return result
 
-def choose_degree(seq_len, rng):
+# Returns the first `count` items of `shuffled(list(range(n)), rng)`, consuming
+# exactly the same random numbers, without shuffling the whole list.
+def shuffled_prefix(n, count, rng):
+    # Same as `rng.next_int(0, n - 1 - i)` for each pick, in one batch
+    picks = [int(d * (n - i)) for i, d in enumerate(rng.next_doubles(count))]
+
+    if count * count > n:
+        remaining = list(range(n))
+        return [remaining.pop(pick) for pick in picks]
+
+    # Few picks: map each index into the remaining items back to the
+    # original item by skipping over the (sorted) items already taken.
+    taken = []
+    result = []
+    for item in picks:
+        for t in taken:
+            if t > item:
+                break
+            item += 1
+        insort(taken, item)
+        result.append(item)
+
+    return result
+
+@lru_cache(maxsize=32)
+def degree_sampler(seq_len):
     degree_probabilities = []
     for i in range(1, seq_len + 1):
         degree_probabilities.append(1.0 / i)
 
-    degree_chooser = RandomSampler(degree_probabilities)
-    return degree_chooser.next(lambda: rng.next_double()) + 1
+    return RandomSampler(degree_probabilities)
 
+def choose_degree(seq_len, rng):
+    degree_chooser = degree_sampler(seq_len)
+    # The sampler draws exactly two doubles, generate them in one batch
+    return degree_chooser.next(iter(rng.next_doubles(2)).__next__) + 1
+
+@lru_cache(maxsize=FRAGMENTS_CACHE_SIZE)
 def choose_fragments(seq_num, seq_len, checksum):
     # The first `seq_len` parts are the "pure" fragments, not mixed with any
     # others. This means that if you only generate the first `seq_len` parts,
     # then you have all the parts you need to decode the message.
     if seq_num <= seq_len:
-        return set([seq_num - 1])
+        return frozenset([seq_num - 1])
     else:
         seed = int_to_bytes(seq_num) + int_to_bytes(checksum)
         rng = Xoshiro256.from_bytes(seed)
         degree = choose_degree(seq_len, rng)
-        indexes = []
-
-        for i in range(seq_len):
-            indexes.append(i)
-        shuffled_indexes = shuffled(indexes, rng)
-        return set(shuffled_indexes[0:degree])
+        return frozenset(shuffled_prefix(seq_len, degree, rng))
 
 def contains(set_or_list, el):
     return el in set_or_list
@@ -5,9 +5,13 @@
 # Licensed under the "BSD-2-Clause Plus Patent License"
 #
 
+import time
+
 from .ur import UR
 from .fountain_encoder import FountainEncoder, Part as FountainEncoderPart
 from .fountain_decoder import FountainDecoder
+from .fountain_utils import contains
+from .cbor_lite import CBORDecoder
 from .bytewords import *
 from .utils import drop_first, is_ur_type
 
@@ -26,11 +30,20 @@ class InvalidSequenceComponent(Exception):
 class InvalidFragment(Exception):
     pass
 
+# CBOR array header plus four 64-bit unsigned integers
+PART_HEADER_MAX_LEN = 1 + 4 * 9
+
 class URDecoder:
-    def __init__(self):
-        self.fountain_decoder = FountainDecoder()
+    def __init__(self, max_mixed_bytes = None):
+        self.fountain_decoder = FountainDecoder(max_mixed_bytes)
         self.expected_type = None
         self.result = None
+        self.processed_seq_nums = set()
+        self.duplicate_parts_count = 0
+        self.known_fragment_parts_count = 0
+        self.received_parts_count = 0
+        self.first_part_time = None
+        self.complete_time = None
 
     @staticmethod
     def decode(str):
@@ -86,6 +99,29 @@ class URDecoder:
         except:
             raise InvalidSequenceComponent()
 
+    # Cheap, unverified peek at the message a part belongs to, without decoding
+    # the whole fragment: (type,) for single-part URs, otherwise
+    # (type, seq_len, message_len, checksum).
+    @staticmethod
+    def message_identity(str):
+        (type, components) = URDecoder.parse(str)
+        if len(components) == 1:
+            return (type,)
+        if len(components) != 2:
+            raise InvalidPathLength()
+
+        try:
+            decoder = CBORDecoder(decode_minimal_prefix(components[1], PART_HEADER_MAX_LEN))
+            decoder.decodeArraySize()
+            decoder.decodeUnsigned()
+            (seq_len, _) = decoder.decodeUnsigned()
+            (message_len, _) = decoder.decodeUnsigned()
+            (checksum, _) = decoder.decodeUnsigned()
+        except Exception:
+            raise InvalidFragment()
+
+        return (type, seq_len, message_len, checksum)
+
     def validate_part(self, type):
         if self.expected_type == None:
             if not is_ur_type(type):
@@ -106,10 +142,15 @@ class URDecoder:
             if not self.validate_part(type):
                 return False
 
+            self.received_parts_count += 1
+            if self.first_part_time == None:
+                self.first_part_time = time.time()
+
             # If this is a single-part UR then we're done
             if len(components) == 1:
                 body = components[0]
                 self.result = self.decode_by_type(type, body)
+                self.complete_time = time.time()
                 return True
 
             # Multi-part URs must have two path components: seq/fragment
@@ -118,8 +159,13 @@ class URDecoder:
             seq = components[0]
             fragment = components[1]
 
-            # Parse the sequence component and the fragment, and make sure they agree.
+            # Parse the sequence component first, so parts we already have are
+            # dropped before paying for the bytewords, CRC and CBOR decoding.
             (seq_num, seq_len) = URDecoder.parse_sequence_component(seq)
+            if self.is_known_part(seq_num, seq_len):
+                return False
+
+            # Parse the fragment, and make sure it agrees with the sequence component.
             cbor = Bytewords.decode(Bytewords_Style_minimal, fragment)
             part = FountainEncoderPart.from_cbor(cbor)
             if seq_num != part.seq_num or seq_len != part.seq_len:
@@ -128,16 +174,68 @@ class URDecoder:
             # Process the part
             if not self.fountain_decoder.receive_part(part):
                 return False
+            self.processed_seq_nums.add(seq_num)
 
             if self.fountain_decoder.is_success():
                 self.result = UR(type, self.fountain_decoder.result_message())
             elif self.fountain_decoder.is_failure():
                 self.result = self.fountain_decoder.result_error()
+            if self.result != None:
+                self.complete_time = time.time()
 
             return True
         except Exception as err:
             return False
 
+    def is_known_part(self, seq_num, seq_len):
+        # Only parts of the message being decoded can be known
+        if self.fountain_decoder.expected_part_indexes == None or seq_len != self.expected_part_count():
+            return False
+
+        # Repeated by a looping sender. Once mixed parts have been evicted, a
+        # repeated one may be useful again, so only pure ones are skipped.
+        if seq_num in self.processed_seq_nums and (seq_num <= seq_len or self.fountain_decoder.evicted_parts_count == 0):
+            self.duplicate_parts_count += 1
+            return True
+
+        # A pure fragment we already have, received or recovered from mixed parts
+        if seq_num <= seq_len and contains(self.fountain_decoder.received_part_indexes, seq_num - 1):
+            self.known_fragment_parts_count += 1
+            return True
+
+        return False
+
+    def rejected_parts_count(self):
+        return self.duplicate_parts_count + self.known_fragment_parts_count
+
+    # Decoding telemetry, to see how many of the scanned frames were useful
+    def metrics(self):
+        fountain_decoder = self.fountain_decoder
+        if fountain_decoder.expected_part_indexes == None:
+            expected_part_count = 1 if self.is_complete() else None
+            rank = 1 if self.is_complete() else 0
+        else:
+            expected_part_count = fountain_decoder.expected_part_count()
+            rank = fountain_decoder.rank()
+
+        decode_seconds = None
+        if self.first_part_time != None and self.complete_time != None:
+            decode_seconds = self.complete_time - self.first_part_time
+
+        return {
+            'received_parts': self.received_parts_count,
+            'duplicate_parts': self.rejected_parts_count() + fountain_decoder.duplicate_parts_count,
+            'useless_parts': fountain_decoder.useless_parts_count,
+            'rank': rank,
+            'expected_part_count': expected_part_count,
+            'mixed_parts': fountain_decoder.mixed_parts_count(),
+            'mixed_bytes': fountain_decoder.mixed_parts_bytes(),
+            'evicted_parts': fountain_decoder.evicted_parts_count,
+            'first_part_time': self.first_part_time,
+            'complete_time': self.complete_time,
+            'decode_seconds': decode_seconds,
+        }
+
     def expected_type(self):
        return self.expected_type
 
@@ -153,6 +251,9 @@ class URDecoder:
     def processed_parts_count(self):
         return self.fountain_decoder.processed_parts_count
 
+    def rank(self):
+        return self.fountain_decoder.rank()
+
     def estimated_percent_complete(self):
         return self.fountain_decoder.estimated_percent_complete()
         
@@ -41,6 +41,20 @@ class UREncoder:
         else:
             return UREncoder.encode_part(self.ur.type, part)
 
+    # The next `count` UR strings, same as calling `next_part` `count` times
+    def next_parts(self, count):
+        parts = self.fountain_encoder.next_parts(count)
+        if self.is_single_part():
+            return [UREncoder.encode(self.ur)] * count
+        return [UREncoder.encode_part(self.ur.type, part) for part in parts]
+
+    # UR strings of all the parts needed to relay the message, followed by
+    # `redundant_count` mixed ones, e.g. for export. Doesn't change the encoder state.
+    def schedule(self, redundant_count):
+        if self.is_single_part():
+            return [UREncoder.encode(self.ur)]
+        return [UREncoder.encode_part(self.ur.type, part) for part in self.fountain_encoder.schedule(redundant_count)]
+
     @staticmethod
     def encode_part(type, part):
         seq = '{}-{}'.format(part.seq_num, part.seq_len)
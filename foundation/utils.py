@@ -66,6 +66,12 @@ def xor_with(a, b):
     xor_into(target, b)
     return target
 
+# XOR two equal-length buffers into a new bytes object, at C speed
+def xor_bytes(a, b):
+    count = len(a)
+    assert(count == len(b)) # Must be the same length
+    return (int.from_bytes(a, 'big') ^ int.from_bytes(b, 'big')).to_bytes(count, 'big')
+
 def take_first(s, count):
     return s[0:count]
 
@@ -109,6 +109,39 @@ class Xoshiro256:
 
         return result
 
+    # Batch versions of `next`, `next_double` and `next_int`: they return the
+    # same values as `count` scalar calls, with the state kept in locals.
+    def next_values(self, count):
+        s0, s1, s2, s3 = self.s
+        result = [0] * count
+        for i in range(count):
+            x = (s1 * 5) & MAX_UINT64
+            result[i] = ((((x << 7) | (x >> 57)) & MAX_UINT64) * 9) & MAX_UINT64
+            t = (s1 << 17) & MAX_UINT64
+
+            s2 ^= s0
+            s3 ^= s1
+            s1 ^= s2
+            s0 ^= s3
+
+            s2 ^= t
+
+            s3 = ((s3 << 45) | (s3 >> 19)) & MAX_UINT64
+
+        self.s[0] = s0
+        self.s[1] = s1
+        self.s[2] = s2
+        self.s[3] = s3
+        return result
+
+    def next_doubles(self, count):
+        m = float(MAX_UINT64) + 1
+        return [nxt / m for nxt in self.next_values(count)]
+
+    def next_ints(self, count, low, high):
+        span = high - low + 1
+        return [int(d * span + low) & MAX_UINT64 for d in self.next_doubles(count)]
+
     def next_double(self):
         m = float(MAX_UINT64) + 1
         nxt = self.next()
@@ -0,0 +1,545 @@
+import base64
+
+from dataclasses import dataclass, field
+from collections import deque
+
+import qrcode
+
+import qr_type
+from bbqr import decode_bbqr_part, decode_bbqr_data, decode_bbqr_file, BBQrInflater
+from transfer_planner import UR_LARGEST_SEQ_NUM, qr_capacity
+
+from foundation.ur_decoder import URDecoder
+from foundation.ur_encoder import UREncoder
+from foundation.fountain_encoder import Part as FountainPart
+from foundation.ur import UR
+
+from urtypes.crypto import PSBT as UR_PSBT
+from urtypes.crypto import Account, Output, HDKey, ECKey, MultiKey, Keypath, PathComponent, SCRIPT_EXPRESSION_TAG_MAP
+from urtypes.bytes import Bytes
+
+from embit.psbt import PSBT
+from embit.descriptor import Descriptor as EmbitDescriptor
+
+
+MAX_LEN = 100
+
+FORMAT_UR = 'UR'
+FORMAT_SPECTER = 'Simple / pMofN (Specter)'
+FORMAT_BBQR = 'BBQR'
+
+COMBO_TYPE_DESCRIPTOR = 'Descriptor'
+COMBO_TYPE_PSBT = 'PSBT'
+COMBO_TYPE_KEY = 'Key'
+COMBO_TYPE_BYTES = 'Bytes'
+
+NO_SPLIT_MAX_CHARS = 999999
+
+# memory cap for UR mixed parts waiting to be reduced while scanning
+UR_MAX_MIXED_BYTES = 32 * 1024 * 1024
+
+# UR parts are generated this many at a time and handed out one per frame
+UR_BATCH_PARTS = 8
+
+
+def descriptor_to_output(descriptor_str):
+    """Convert a descriptor string to a urtypes Output object."""
+    from embit.networks import NETWORKS
+
+    # Parse descriptor using embit
+    embit_desc = EmbitDescriptor.from_string(descriptor_str)
+
+    # Check for advanced miniscript - crypto-output only supports basic descriptors
+    if hasattr(embit_desc, 'miniscript') and embit_desc.miniscript and not embit_desc.is_basic_multisig:
+        # Check if it's an advanced miniscript (not just pk/pkh/wpkh)
+        miniscript_str = str(embit_desc.miniscript)
+        advanced_operators = ['or_d', 'or_c', 'or_i', 'or_b', 'and_v', 'and_b', 'and_n',
+                             'andor', 'thresh', 'older', 'after', 'sha256', 'hash256',
+                             'ripemd160', 'hash160']
+        if any(op in miniscript_str for op in advanced_operators):
+            raise ValueError(f"crypto-output does not support advanced miniscript: {miniscript_str}")
+
+    # Check for taproot miniscripts
+    if hasattr(embit_desc, 'is_taproot') and embit_desc.is_taproot and embit_desc.taptree:
+        def check_taptree_for_advanced_miniscript(tree_obj):
+            """Recursively check taptree for advanced miniscripts."""
+            advanced_operators = ['or_d', 'or_c', 'or_i', 'or_b', 'and_v', 'and_b', 'and_n',
+                                 'andor', 'thresh', 'older', 'after', 'sha256', 'hash256',
+                                 'ripemd160', 'hash160']
+
+            if hasattr(tree_obj, 'miniscript') and tree_obj.miniscript is not None:
+                miniscript_str = str(tree_obj.miniscript)
+                if any(op in miniscript_str for op in advanced_operators):
+                    raise ValueError(f"crypto-output does not support advanced miniscript: {miniscript_str}")
+
+            if hasattr(tree_obj, 'tree') and tree_obj.tree is not None:
+                if isinstance(tree_obj.tree, (list, tuple)):
+                    for item in tree_obj.tree:
+                        check_taptree_for_advanced_miniscript(item)
+                else:
+                    check_taptree_for_advanced_miniscript(tree_obj.tree)
+
+        check_taptree_for_advanced_miniscript(embit_desc.taptree)
+
+    # Build script expressions list based on descriptor type
+    script_expressions = []
+    script_type = embit_desc.scriptpubkey_type()
+
+    # Map embit script types to urtypes script expressions
+    # sh = 400, wsh = 401, pk = 402, pkh = 403, wpkh = 404, multi = 406, sortedmulti = 407
+    if embit_desc.is_wrapped:
+        script_expressions.append(SCRIPT_EXPRESSION_TAG_MAP[400])  # sh
+
+    if script_type == "p2wsh":
+        script_expressions.append(SCRIPT_EXPRESSION_TAG_MAP[401])  # wsh
+        if embit_desc.is_basic_multisig:
+            if embit_desc.is_sorted:
+                script_expressions.append(SCRIPT_EXPRESSION_TAG_MAP[407])  # sortedmulti
+            else:
+                script_expressions.append(SCRIPT_EXPRESSION_TAG_MAP[406])  # multi
+    elif script_type == "p2wpkh":
+        script_expressions.append(SCRIPT_EXPRESSION_TAG_MAP[404])  # wpkh
+    elif script_type == "p2pkh":
+        script_expressions.append(SCRIPT_EXPRESSION_TAG_MAP[403])  # pkh
+    elif script_type == "p2pk":
+        script_expressions.append(SCRIPT_EXPRESSION_TAG_MAP[402])  # pk
+
+    # Convert keys
+    embit_keys = embit_desc.keys
+
+    # Handle multisig
+    if embit_desc.is_basic_multisig:
+        # Get threshold from the miniscript args
+        threshold = 1  # default
+        if hasattr(embit_desc, 'miniscript') and embit_desc.miniscript:
+            # The first argument is a Number object with the threshold
+            threshold = embit_desc.miniscript.args[0].num
+
+        ec_keys = []
+        hd_keys = []
+
+        for embit_key in embit_keys:
+            if embit_key.is_extended:
+                hd_keys.append(_convert_hd_key(embit_key))
+            else:
+                ec_keys.append(_convert_ec_key(embit_key))
+
+        crypto_key = MultiKey(threshold, ec_keys, hd_keys)
+    else:
+        # Single key
+        embit_key = embit_keys[0]
+        if embit_key.is_extended:
+            crypto_key = _convert_hd_key(embit_key)
+        else:
+            crypto_key = _convert_ec_key(embit_key)
+
+    return Output(script_expressions, crypto_key)
+
+
+def _convert_ec_key(embit_key):
+    """Convert embit Key to urtypes ECKey."""
+
+    # Get the public key bytes
+    pubkey_bytes = embit_key.key.sec()
+
+    # ECKey(data, origin=None, name=None)
+    return ECKey(pubkey_bytes, None, None)
+
+
+def _convert_hd_key(embit_key):
+    """Convert embit extended Key to urtypes HDKey."""
+    from urtypes.crypto import CoinInfo
+
+    xpub = embit_key.key
+
+    # Build HDKey dict
+    hd_dict = {
+        "private_key": False,  # Explicitly mark as public key (required for proper CBOR encoding)
+        "key": xpub.key.sec(),
+        "chain_code": xpub.chain_code,
+    }
+
+    # Handle origin (derivation path)
+    if embit_key.origin:
+        origin_components = []
+        for component in embit_key.origin.derivation:
+            is_hardened = component >= 0x80000000
+            index = component - 0x80000000 if is_hardened else component
+            origin_components.append(PathComponent(index, is_hardened))
+
+        origin_fingerprint = embit_key.origin.fingerprint
+        # Set depth to the number of components in the origin path
+        origin_depth = len(origin_components)
+        hd_dict["origin"] = Keypath(
+            origin_components,
+            origin_fingerprint,
+            origin_depth
+        )
+
+    # Add use_info for Bitcoin (type=0, network=0 for mainnet, 1 for testnet)
+    # Determine network from coin type in origin path (coin_type 0 = mainnet, 1 = testnet)
+    network = 0  # Default to mainnet
+    if embit_key.origin and len(embit_key.origin.derivation) >= 2:
+        coin_type = embit_key.origin.derivation[1]
+        # Remove hardened bit to get coin type value
+        coin_type_val = coin_type - 0x80000000 if coin_type >= 0x80000000 else coin_type
+        network = 1 if coin_type_val == 1 else 0
+
+    hd_dict["use_info"] = CoinInfo(0, network)
+
+    # Parent fingerprint
+    if hasattr(xpub, 'fingerprint'):
+        hd_dict["parent_fingerprint"] = xpub.fingerprint
+
+    return HDKey(hd_dict)
+
+
+class GenerateCancelled(Exception):
+    '''QR generation was stopped before the QR data was ready'''
+
+
+@dataclass
+class QRCode:
+    data: str = ''
+    total_sequences: int = 0
+    sequences_count: int = 0
+    is_completed: bool = False
+    qr_type = None
+
+    def append(self, data: str):
+        self.data_init(1)
+        self.data = data
+        self.sequences_count += 1
+        self.is_completed = True
+
+    def data_init(self, sequences: int):
+        self.total_sequences = sequences
+        self.sequences_count = 0
+
+    def largest_frame(self) -> str:
+        return self.data
+
+
+@dataclass
+class MultiQRCode(QRCode):
+    data_stack: list = field(default_factory=list)
+    is_init: bool = False
+    current: int = 0
+    total_sequences = None
+    qr_type = None
+    data_type = None
+    decoder = None
+    encoder = None
+    bbqr_encoding = None
+    bbqr_file_type = None
+    # "Z" BBQR parts are decompressed in order, as soon as the previous ones arrived
+    bbqr_inflater = None
+    bbqr_inflated_parts = 0
+    # a corrupted BBQR stream, or a Specter / BBQR part different from the one
+    # already in its slot (another code with the same key)
+    error = None
+    ur_parts = None
+
+    def largest_frame(self) -> str:
+        '''A frame at least as long as any frame of the animation'''
+        if self.qr_type == qr_type.SPECTER:
+            return f"p{self.total_sequences}of{self.total_sequences} " + max(self.data_stack, key=len)
+
+        elif self.qr_type == qr_type.BBQR:
+            return max(self.data_stack, key=len)
+
+        elif self.qr_type == qr_type.UR:
+            if self.encoder.is_single_part():
+                return UREncoder.encode(self.encoder.ur).upper()
+            # sequence numbers keep growing, size the frame for the largest one
+            encoder = self.encoder.fountain_encoder
+            part = FountainPart(UR_LARGEST_SEQ_NUM, encoder.seq_len(), encoder.message_len,
+                                encoder.checksum, bytes(encoder.fragment_len))
+            return UREncoder.encode_part(self.encoder.ur.type, part).upper()
+
+        return self.data
+
+    def step(self):
+        if self.qr_type in (qr_type.SPECTER, qr_type.BBQR):
+            self.total_sequences = len(self.data_stack)
+
+            return f"{self.current + 1}/{self.total_sequences}"
+
+        elif self.qr_type == qr_type.UR:
+            return f"{self.current + 1}/{self.total_sequences}"
+
+    def append(self, data: tuple):
+        if self.qr_type == qr_type.SPECTER:
+            self.append_specter(data)
+
+        elif self.qr_type == qr_type.UR:
+            self.append_ur(data)
+
+        elif self.qr_type == qr_type.BBQR:
+            self.append_bbqr(data)
+
+    def append_bbqr(self, data: tuple):
+        data, sequence, total_sequences = data
+
+        if not self.is_init:
+            self.data_init(total_sequences)
+            self.is_init = True
+
+        # parts are decoded as they arrive, only the joined bytes are left for the end
+        part = decode_bbqr_part(data, self.bbqr_encoding)
+        if self.data_stack[sequence] is None:
+            self.data_stack[sequence] = part
+            self.sequences_count += 1
+        elif part != self.data_stack[sequence]:
+            self.part_conflict(sequence)
+            return
+
+        if self.bbqr_encoding == 'Z':
+            self.inflate_bbqr()
+        self.check_complete_bbrq()
+
+    def inflate_bbqr(self):
+        '''Decompress the parts received so far without a gap, so only the tail is left at the end'''
+        if self.bbqr_inflater is None:
+            self.bbqr_inflater = BBQrInflater()
+        try:
+            while self.bbqr_inflated_parts < self.total_sequences and self.data_stack[self.bbqr_inflated_parts] is not None:
+                self.bbqr_inflater.feed(self.data_stack[self.bbqr_inflated_parts])
+                self.bbqr_inflated_parts += 1
+        except ValueError as e:
+            # a corrupted stream, no need to wait for the other parts
+            print("fail to complete BBQR parsing:", e)
+            self.error = e
+
+    def check_complete_bbrq(self):
+        if self.sequences_count == self.total_sequences and self.error is None:
+            if self.bbqr_encoding == 'Z':
+                try:
+                    self.data = decode_bbqr_file(self.bbqr_inflater.finish(), self.bbqr_file_type)
+                except ValueError as e:
+                    print("fail to complete BBQR parsing:", e)
+                    self.error = e
+                    return
+            else:
+                self.data = decode_bbqr_data(b''.join(self.data_stack), self.bbqr_encoding, self.bbqr_file_type)
+            self.is_completed = True
+
+    def part_conflict(self, index):
+        '''Fail the session, part index came again with different data'''
+        print(f"fail to complete {self.qr_type} parsing: part {index + 1} has different data")
+        self.error = ValueError('Same sequences have different data!')
+
+    def is_failure(self):
+        if self.qr_type == qr_type.UR:
+            return self.decoder.is_failure()
+        return self.error is not None
+
+
+    def append_specter(self, data: tuple):
+        # print(f'MultiQRCode.append({data})')
+        sequence = data[0]
+        total_sequences = data[1]
+        data = data[2]
+
+        if not self.is_init:
+            self.data_init(total_sequences)
+            self.is_init = True
+
+        if self.data_stack[sequence-1] is None:
+            self.data_stack[sequence-1] = data
+            self.sequences_count += 1
+        elif data != self.data_stack[sequence-1]:
+            self.part_conflict(sequence - 1)
+            return
+        self.check_complete_specter()
+
+    def append_ur(self, data: tuple):
+        if not self.decoder:
+            self.decoder = URDecoder(UR_MAX_MIXED_BYTES)
+
+        self.decoder.receive_part(data)
+
+        self.check_complete_ur()
+
+    def data_init(self, sequences: int):
+        super().data_init(sequences)
+        self.data_stack = [None] * sequences
+
+    def check_complete_specter(self):
+        if self.sequences_count == self.total_sequences:
+            self.is_completed = True
+            self.data = ''.join(self.data_stack)
+
+    def check_complete_ur(self):
+        if self.decoder.is_complete():
+            if self.decoder.is_success():
+                self.is_completed = True
+                cbor = self.decoder.result_message().cbor
+                _type = self.decoder.result_message().type
+                #  XPub
+                if _type == 'crypto-account':
+                    self.data = Account.from_cbor(cbor).output_descriptors[0].descriptor()
+                #  PSBT
+                elif _type == 'crypto-psbt':
+                    self.data = UR_PSBT.from_cbor(cbor).data
+                    if type(self.data) is bytes:
+                        self.data = PSBT.parse(self.data).to_string()
+                #  Descriptor
+                elif _type == 'crypto-output':
+                    self.data = Output.from_cbor(cbor).descriptor()
+                #  bytes
+                elif _type == 'bytes':
+                    self.data = Bytes.from_cbor(cbor).data
+                    if isinstance(self.data, bytes):
+                        try:
+                            self.data = self.data.decode('utf-8')
+                        except:
+                            self.data = self.data.hex()
+                # unknown
+                else:
+                    print(f"\nUR type not yet implemented: {_type}")
+                    return
+
+                print(f"\nUR parts skipped before decoding: {self.decoder.duplicate_parts_count} repeated, "
+                      f"{self.decoder.known_fragment_parts_count} already known fragments")
+                # print(f"\nUR type: {_type}")
+            # decodef fail!
+            else:
+                print("fail to complete UR parsing: ", end='')
+                print(self.decoder.result_error())
+
+    @staticmethod
+    def from_string(data, _max=MAX_LEN, type=None, format=None, smallest=False, progress=None,
+                    level=qrcode.constants.ERROR_CORRECT_L):
+        # progress, when given, is called with the name of each encoding stage,
+        # level is the ECC level BBQR parts are capped for
+        if (_max and len(data) > _max) or format == FORMAT_UR or format == FORMAT_BBQR:
+            out = MultiQRCode()
+            out.data = data
+
+            if format == FORMAT_UR:
+                out.qr_type = qr_type.UR
+            elif format == FORMAT_SPECTER:
+                out.qr_type = qr_type.SPECTER
+            elif format == FORMAT_BBQR:
+                out.qr_type = qr_type.BBQR
+
+            if format == FORMAT_SPECTER:
+                if progress:
+                    progress('Splitting')
+                out.data_stack = [data[i:i + _max] for i in range(0, len(data), _max)]
+
+                out.total_sequences = len(out.data_stack)
+                out.sequences_count = out.total_sequences
+                out.is_completed = True
+
+            elif format == FORMAT_BBQR:
+                from bbqr import encode_bbqr, BBQR_PREFIX_LENGTH
+
+                # split size is the part length, without the header, and
+                # a part never outgrows a version 40 QR ("No split" included)
+                capacity = min(_max + BBQR_PREFIX_LENGTH, qr_capacity(40, level, qrcode.util.MODE_ALPHA_NUM))
+                if progress:
+                    progress('Compressing')
+                if smallest:
+                    from bbqr_search import smallest_bbqr
+                    bb, report = smallest_bbqr(MultiQRCode.bbqr_bytes(data), capacity)
+                    print(f"BBQR smallest output: {report['parts']} parts, {report['parts_saved']} fewer, "
+                          f"{report['bytes_saved']} bytes saved (level {report['level']}, "
+                          f"memLevel {report['mem_level']}, strategy {report['strategy']})")
+                else:
+                    bb = encode_bbqr(MultiQRCode.bbqr_bytes(data))
+
+                if progress:
+                    progress('Splitting')
+                count = 1
+                for sequence, total in bb.to_qr_code(capacity):
+                    out.data_stack.append(sequence)
+                    count += 1
+                    if count > total:
+                        break
+                out.total_sequences = total
+                out.sequences_count = out.total_sequences
+                out.is_completed = True
+
+                if total == 1:
+                    out.data = sequence
+
+            elif format == FORMAT_UR:
+                if not _max:
+                    _max = 100000
+
+                if progress:
+                    progress('Converting to UR')
+                ur = MultiQRCode.ur_from_string(data, type)
+                if not ur:
+                    return
+                out.data_type = ur.type
+
+                if progress:
+                    progress('Preparing fountain encoder')
+
+                out.encoder = UREncoder(ur, _max)
+                out.total_sequences = out.encoder.fountain_encoder.seq_len()
+        else:
+            # SINGLE NORMAL QR CODE
+            out = QRCode()
+            out.data = data
+            out.data_init(1)
+
+        return out
+
+    @staticmethod
+    def ur_from_string(data, type):
+        '''UR message of the data for the given data type, None for unknown types'''
+        if type == 'PSBT':
+            data = PSBT.from_string(data).serialize()
+            return UR('crypto-psbt', UR_PSBT(data).to_cbor())
+        elif type == 'Descriptor':
+            # Try to encode as crypto-output, fall back to bytes for complex descriptors
+            try:
+                output_obj = descriptor_to_output(data)
+                return UR('crypto-output', output_obj.to_cbor())
+            except Exception as e:
+                print(f"Cannot encode as crypto-output ({e}), encoding as bytes instead")
+                return UR('bytes', Bytes(data).to_cbor())
+        elif type == 'Key':
+            return UR('bytes', Bytes(data).to_cbor())
+        elif type == 'Bytes':
+            return UR('bytes', Bytes(data).to_cbor())
+
+    @staticmethod
+    def bbqr_bytes(data):
+        '''Bytes sent as BBQR: base64 is decoded, anything else is sent as utf-8'''
+        try:
+            return base64.b64decode(data)
+        except:
+            print("Error executing b64decode for BBQR, will encode as utf-8")
+            return bytes(data, "utf-8")
+
+    def next(self) -> str:
+        data = None
+        if self.qr_type == qr_type.SPECTER:
+            data = self.data_stack[self.current]
+
+            digit_a = self.current + 1
+            digit_b = self.total_sequences
+
+            data = f"p{digit_a}of{digit_b} {data}"
+
+            self.current += 1
+            if self.current >= self.total_sequences:
+                self.current = 0
+        elif self.qr_type == qr_type.UR:
+            if not self.ur_parts:
+                first = self.encoder.fountain_encoder.seq_num
+                self.ur_parts = deque(enumerate(self.encoder.next_parts(UR_BATCH_PARTS), first))
+            self.current, data = self.ur_parts.popleft()
+            data = data.upper()
+        elif self.qr_type == qr_type.BBQR:
+            data = self.data_stack[self.current]
+            self.current += 1
+            if self.current >= self.total_sequences:
+                self.current = 0
+        
+        return data
@@ -0,0 +1,151 @@
+"""
+Headless export of QR codes and animations, without a display:
+
+    python qr_export.py psbt.txt psbt.gif --format bbqr --split 300
+    python qr_export.py psbt.txt frames/ --format ur --type PSBT --parts 60
+"""
+import os
+import time
+import base64
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import qrcode
+import cv2
+from PIL import Image
+
+import qr_type
+from qr_render import qr_pixels, fit_qr, make_qr, DARK, LIGHT
+from transfer_planner import QR_BORDER
+from qr_code import (MultiQRCode, MAX_LEN, NO_SPLIT_MAX_CHARS, FORMAT_SPECTER, FORMAT_UR, FORMAT_BBQR,
+                     COMBO_TYPE_DESCRIPTOR, COMBO_TYPE_PSBT, COMBO_TYPE_KEY, COMBO_TYPE_BYTES)
+
+FORMATS = {"specter": FORMAT_SPECTER, "ur": FORMAT_UR, "bbqr": FORMAT_BBQR}
+ECC_LEVELS = {
+    "L": qrcode.constants.ERROR_CORRECT_L,
+    "M": qrcode.constants.ERROR_CORRECT_M,
+    "Q": qrcode.constants.ERROR_CORRECT_Q,
+    "H": qrcode.constants.ERROR_CORRECT_H,
+}
+DATA_TYPES = (COMBO_TYPE_DESCRIPTOR, COMBO_TYPE_PSBT, COMBO_TYPE_KEY, COMBO_TYPE_BYTES)
+
+VIDEO_EXTENSIONS = {".mp4": "mp4v", ".avi": "MJPG"}
+
+
+def read_payload(path):
+    """Text of the file, binary files (e.g. a raw PSBT) as base64"""
+    with open(path, "rb") as f:
+        raw = f.read()
+    try:
+        return raw.decode("utf-8").strip()
+    except UnicodeDecodeError:
+        return base64.b64encode(raw).decode()
+
+
+def animation_frames(qr_data, ur_parts=None):
+    """Data of every frame: a whole Specter or BBQR cycle, or ur_parts UR parts (a full set by default)"""
+    if not isinstance(qr_data, MultiQRCode):
+        return [qr_data.data]
+    count = qr_data.total_sequences
+    if qr_data.qr_type == qr_type.UR and ur_parts:
+        count = ur_parts
+    return [qr_data.next() for _ in range(count)]
+
+
+def render_frame(job):
+    """Runs on the worker processes: pixels of a single frame, padded to size x size"""
+    data, level, version, mask, size, inverted = job
+    qr = make_qr(data, level, version, mask)
+    pixels = qr_pixels(qr.modules, qr.border, size, inverted)
+
+    # frames that needed a larger version may be scaled to a different side
+    canvas = np.full((size, size), DARK if inverted else LIGHT, dtype=np.uint8)
+    offset = (size - pixels.shape[0]) // 2
+    canvas[offset:offset + pixels.shape[0], offset:offset + pixels.shape[1]] = pixels
+    return canvas
+
+
+def write_frames(frames, output, delay):
+    """Writes an animated GIF/PNG, a video or, for any other path, a directory of numbered PNGs"""
+    extension = os.path.splitext(output)[1].lower()
+
+    if extension in (".gif", ".png", ".apng"):
+        images = [Image.fromarray(frame, "L") for frame in frames]
+        images[0].save(output, format="GIF" if extension == ".gif" else "PNG", save_all=True,
+                       append_images=images[1:], duration=delay, loop=0)
+
+    elif extension in VIDEO_EXTENSIONS:
+        size = frames[0].shape[0]
+        fourcc = cv2.VideoWriter_fourcc(*VIDEO_EXTENSIONS[extension])
+        video = cv2.VideoWriter(output, fourcc, 1000 / delay, (size, size), isColor=False)
+        if not video.isOpened():
+            raise ValueError(f"Cannot write video {output}")
+        for frame in frames:
+            video.write(frame)
+        video.release()
+
+    else:
+        os.makedirs(output, exist_ok=True)
+        digits = len(str(len(frames)))
+        for i, frame in enumerate(frames, 1):
+            Image.fromarray(frame, "L").save(os.path.join(output, f"frame_{i:0{digits}}.png"))
+
+
+def export(args):
+    data = read_payload(args.input)
+    split = NO_SPLIT_MAX_CHARS if args.no_split else args.split
+    level = ECC_LEVELS[args.ecc]
+    qr_data = MultiQRCode.from_string(data, _max=split, type=args.type, format=FORMATS[args.format],
+                                      smallest=args.smallest, level=level)
+    if not qr_data:
+        raise ValueError(f"Cannot encode the payload as {args.format}")
+
+    largest_frame = qr_data.largest_frame() if isinstance(qr_data, MultiQRCode) else qr_data.data
+    try:
+        version, mask = fit_qr(largest_frame, level, args.version, args.mask)
+    except (ValueError, qrcode.exceptions.DataOverflowError):
+        raise ValueError("The largest frame doesn't fit in a QR code, use a smaller split size")
+    # at least one pixel per module, quiet zone included
+    modules = version * 4 + 17 + 2 * QR_BORDER
+    if args.size < modules:
+        raise ValueError(f"QR version {version} needs a size of at least {modules} pixels")
+    frames = animation_frames(qr_data, args.parts)
+
+    start = time.perf_counter()
+    jobs = [(frame, level, version, mask, args.size, args.inverted) for frame in frames]
+    workers = args.workers or os.cpu_count()
+    with ProcessPoolExecutor(workers) as pool:
+        rendered = list(pool.map(render_frame, jobs, chunksize=max(1, len(jobs) // (4 * workers))))
+    elapsed = time.perf_counter() - start
+
+    write_frames(rendered, args.output, args.delay)
+    print(f"{len(rendered)} frames, QR version {version}, rendered in {elapsed:.2f}s "
+          f"({len(rendered) / elapsed:.1f} frames/s), written to {args.output}")
+
+
+def main():
+    p = argparse.ArgumentParser(description="Export QR codes and animations to GIF, APNG, video or PNG frames")
+    p.add_argument("input", help="file with the payload, binary files are sent as base64")
+    p.add_argument("output", help="output .gif, .png/.apng, .mp4/.avi, or a directory for PNG frames")
+    p.add_argument("--format", choices=FORMATS, default="specter")
+    p.add_argument("--type", choices=DATA_TYPES, default=COMBO_TYPE_PSBT, help="UR data type")
+    p.add_argument("--ecc", choices=ECC_LEVELS, default="L")
+    p.add_argument("--split", type=int, default=MAX_LEN, help="QR split size")
+    p.add_argument("--no-split", action="store_true")
+    p.add_argument("--smallest", action="store_true", help="search the BBQR compression with fewest parts")
+    p.add_argument("--parts", type=int, help="UR parts to export, a full set by default")
+    p.add_argument("--version", type=int, choices=range(1, 41), metavar="1-40", help="fixed QR version")
+    p.add_argument("--mask", type=int, choices=range(8), metavar="0-7", help="fixed QR mask pattern")
+    p.add_argument("--size", type=int, default=450, help="frame size in pixels")
+    p.add_argument("--inverted", action="store_true")
+    p.add_argument("--delay", type=int, default=200, help="ms each frame is shown")
+    p.add_argument("--workers", type=int, help="render processes, one per CPU by default")
+    try:
+        export(p.parse_args())
+    except ValueError as e:
+        p.exit(1, f"{e}\n")
+
+
+if __name__ == "__main__":
+    main()
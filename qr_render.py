@@ -0,0 +1,59 @@
+import numpy as np
+import qrcode
+
+DARK = 0
+LIGHT = 255
+
+
+def qr_pixels(modules, border, size, inverted=False):
+    """Renders a QR module matrix as a grayscale square of at most size x size pixels.
+
+    Every module becomes a block of whole pixels (integer nearest-neighbour
+    scaling), so there is no resampling, and the quiet zone is added as
+    `border` modules of background. Returns a C-contiguous uint8 array.
+    """
+    matrix = np.asarray(modules, dtype=bool)
+    if border:
+        matrix = np.pad(matrix, border, constant_values=False)
+
+    count = matrix.shape[0]
+    scale = max(1, size // count)
+
+    foreground, background = (LIGHT, DARK) if inverted else (DARK, LIGHT)
+    pixels = np.where(matrix, np.uint8(foreground), np.uint8(background))
+
+    # (count, count) -> (count * scale, count * scale) in a single copy
+    side = count * scale
+    pixels = np.broadcast_to(pixels[:, None, :, None], (count, scale, count, scale))
+    return np.ascontiguousarray(pixels).reshape(side, side)
+
+
+def fit_qr(data, level, version=None, mask=None):
+    """QR version and mask pattern for data: the smallest version it fits and
+    the best mask, unless given. A given version too small for data is
+    replaced by the smallest one it fits.
+    """
+    qr = qrcode.QRCode(error_correction=level)
+    qr.add_data(data)
+    fitted = qr.best_fit(start=version)
+    if version is not None and fitted != version:
+        print(f"QR data doesn't fit version {version}, using version {fitted}")
+    if mask is None:
+        # picked on the fitted version, the one frames are drawn with
+        mask = qr.best_mask_pattern()
+    return fitted, mask
+
+
+def make_qr(data, level, version, mask):
+    """QR code of data with the given version and mask, or a larger version if it doesn't fit"""
+    qr = qrcode.QRCode(version=version, error_correction=level, mask_pattern=mask)
+    qr.add_data(data)
+    try:
+        # no version fitting nor mask search, every frame has the same size
+        qr.make(fit=False)
+    except qrcode.exceptions.DataOverflowError:
+        print(f"QR data doesn't fit version {version}, using a larger one for this frame")
+        qr = qrcode.QRCode(error_correction=level, mask_pattern=mask)
+        qr.add_data(data)
+        qr.make()
+    return qr
@@ -1,22 +1,26 @@
 import sys
 import os
 import re
+import time
+import hashlib
+import multiprocessing
 
-from dataclasses import dataclass, field
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from statistics import fmean, pstdev
 
 from pathlib import Path
 
 from yaml import load, dump
 from yaml.loader import SafeLoader as Loader
 
-from PySide6.QtWidgets import QApplication, QMainWindow
+from PySide6.QtWidgets import QApplication, QMainWindow, QFileDialog
 from PySide6.QtGui import QImage, QPixmap, QPalette, QColor, QColorConstants, QIcon
-from PySide6.QtCore import Qt, QFile, QThread, Signal, QEvent
+from PySide6.QtCore import Qt, QFile, QThread, Signal, QEvent, QStandardPaths
 from PySide6.QtUiTools import QUiLoader
 from PySide6.QtGui import QTextOption, QFontDatabase
 
-from PIL import ImageQt
-
 from pyzbar import pyzbar
 import zxingcpp
 
@@ -25,495 +29,67 @@ import qrcode
 import cv2
 
 import qr_type
+from qr_render import qr_pixels, fit_qr, make_qr
+from session_store import SessionStore
+from transfer_planner import plan_transfer, version_for_size, data_mode
+from qr_code import (QRCode, MultiQRCode, GenerateCancelled, NO_SPLIT_MAX_CHARS,
+                     FORMAT_UR, FORMAT_SPECTER, FORMAT_BBQR,
+                     COMBO_TYPE_DESCRIPTOR, COMBO_TYPE_PSBT, COMBO_TYPE_KEY, COMBO_TYPE_BYTES)
 
 from foundation.ur_decoder import URDecoder
-from foundation.ur_encoder import UREncoder
-from foundation.ur import UR
-
-from urtypes.crypto import PSBT as UR_PSBT
-from urtypes.crypto import Account, Output, HDKey, ECKey, MultiKey, Keypath, PathComponent, SCRIPT_EXPRESSION_TAG_MAP
-from urtypes.bytes import Bytes
-
-from embit.psbt import PSBT
-from embit.descriptor import Descriptor as EmbitDescriptor
 
 from mss import mss
 import numpy as np
-import base64
 
 import assets_rc
 
 
 VERSION="1.4.1"
 
-MAX_LEN = 100
 FILL_COLOR = "#434343"
 
 STOP_QR_TXT = 'Remove QR'
 STOP_READ_TXT = ' Stop'
 START_READ_TXT = ' Scan'
 GENERATE_TXT = 'Generate QR'
+CANCEL_GENERATE_TXT = 'Cancel'
+CANCELLING_TXT = 'Cancelling...'
 
 ANIMATED_QR_FIRST_FRAME_DELAY = 900 #ms
 
-FORMAT_UR = 'UR'
-FORMAT_SPECTER = 'Simple / pMofN (Specter)'
-FORMAT_BBQR = 'BBQR'
-
-COMBO_TYPE_DESCRIPTOR = 'Descriptor'
-COMBO_TYPE_PSBT = 'PSBT'
-COMBO_TYPE_KEY = 'Key'
-COMBO_TYPE_BYTES = 'Bytes'
-
 ECC_L = 'ECC L 7%'
 ECC_M = 'ECC M 15%'
 ECC_Q = 'ECC Q 25%'
 ECC_H = 'ECC H 30%'
 
-NO_SPLIT_MAX_CHARS = 999999
-
-PYZBAR_SYMBOLS = (pyzbar.ZBarSymbol.QRCODE, pyzbar.ZBarSymbol.SQCODE)
-
-# helper obj to handle bbqr encoding and file_type
-bbqr_obj = None
-
-sequence_reader = 0
-
-
-def descriptor_to_output(descriptor_str):
-    """Convert a descriptor string to a urtypes Output object."""
-    from embit.networks import NETWORKS
-
-    # Parse descriptor using embit
-    embit_desc = EmbitDescriptor.from_string(descriptor_str)
-
-    # Check for advanced miniscript - crypto-output only supports basic descriptors
-    if hasattr(embit_desc, 'miniscript') and embit_desc.miniscript and not embit_desc.is_basic_multisig:
-        # Check if it's an advanced miniscript (not just pk/pkh/wpkh)
-        miniscript_str = str(embit_desc.miniscript)
-        advanced_operators = ['or_d', 'or_c', 'or_i', 'or_b', 'and_v', 'and_b', 'and_n',
-                             'andor', 'thresh', 'older', 'after', 'sha256', 'hash256',
-                             'ripemd160', 'hash160']
-        if any(op in miniscript_str for op in advanced_operators):
-            raise ValueError(f"crypto-output does not support advanced miniscript: {miniscript_str}")
-
-    # Check for taproot miniscripts
-    if hasattr(embit_desc, 'is_taproot') and embit_desc.is_taproot and embit_desc.taptree:
-        def check_taptree_for_advanced_miniscript(tree_obj):
-            """Recursively check taptree for advanced miniscripts."""
-            advanced_operators = ['or_d', 'or_c', 'or_i', 'or_b', 'and_v', 'and_b', 'and_n',
-                                 'andor', 'thresh', 'older', 'after', 'sha256', 'hash256',
-                                 'ripemd160', 'hash160']
-
-            if hasattr(tree_obj, 'miniscript') and tree_obj.miniscript is not None:
-                miniscript_str = str(tree_obj.miniscript)
-                if any(op in miniscript_str for op in advanced_operators):
-                    raise ValueError(f"crypto-output does not support advanced miniscript: {miniscript_str}")
-
-            if hasattr(tree_obj, 'tree') and tree_obj.tree is not None:
-                if isinstance(tree_obj.tree, (list, tuple)):
-                    for item in tree_obj.tree:
-                        check_taptree_for_advanced_miniscript(item)
-                else:
-                    check_taptree_for_advanced_miniscript(tree_obj.tree)
-
-        check_taptree_for_advanced_miniscript(embit_desc.taptree)
-
-    # Build script expressions list based on descriptor type
-    script_expressions = []
-    script_type = embit_desc.scriptpubkey_type()
-
-    # Map embit script types to urtypes script expressions
-    # sh = 400, wsh = 401, pk = 402, pkh = 403, wpkh = 404, multi = 406, sortedmulti = 407
-    if embit_desc.is_wrapped:
-        script_expressions.append(SCRIPT_EXPRESSION_TAG_MAP[400])  # sh
-
-    if script_type == "p2wsh":
-        script_expressions.append(SCRIPT_EXPRESSION_TAG_MAP[401])  # wsh
-        if embit_desc.is_basic_multisig:
-            if embit_desc.is_sorted:
-                script_expressions.append(SCRIPT_EXPRESSION_TAG_MAP[407])  # sortedmulti
-            else:
-                script_expressions.append(SCRIPT_EXPRESSION_TAG_MAP[406])  # multi
-    elif script_type == "p2wpkh":
-        script_expressions.append(SCRIPT_EXPRESSION_TAG_MAP[404])  # wpkh
-    elif script_type == "p2pkh":
-        script_expressions.append(SCRIPT_EXPRESSION_TAG_MAP[403])  # pkh
-    elif script_type == "p2pk":
-        script_expressions.append(SCRIPT_EXPRESSION_TAG_MAP[402])  # pk
-
-    # Convert keys
-    embit_keys = embit_desc.keys
-
-    # Handle multisig
-    if embit_desc.is_basic_multisig:
-        # Get threshold from the miniscript args
-        threshold = 1  # default
-        if hasattr(embit_desc, 'miniscript') and embit_desc.miniscript:
-            # The first argument is a Number object with the threshold
-            threshold = embit_desc.miniscript.args[0].num
-
-        ec_keys = []
-        hd_keys = []
-
-        for embit_key in embit_keys:
-            if embit_key.is_extended:
-                hd_keys.append(_convert_hd_key(embit_key))
-            else:
-                ec_keys.append(_convert_ec_key(embit_key))
-
-        crypto_key = MultiKey(threshold, ec_keys, hd_keys)
-    else:
-        # Single key
-        embit_key = embit_keys[0]
-        if embit_key.is_extended:
-            crypto_key = _convert_hd_key(embit_key)
-        else:
-            crypto_key = _convert_ec_key(embit_key)
-
-    return Output(script_expressions, crypto_key)
-
-
-def _convert_ec_key(embit_key):
-    """Convert embit Key to urtypes ECKey."""
-
-    # Get the public key bytes
-    pubkey_bytes = embit_key.key.sec()
-
-    # ECKey(data, origin=None, name=None)
-    return ECKey(pubkey_bytes, None, None)
-
-
-def _convert_hd_key(embit_key):
-    """Convert embit extended Key to urtypes HDKey."""
-    from urtypes.crypto import CoinInfo
-
-    xpub = embit_key.key
-
-    # Build HDKey dict
-    hd_dict = {
-        "private_key": False,  # Explicitly mark as public key (required for proper CBOR encoding)
-        "key": xpub.key.sec(),
-        "chain_code": xpub.chain_code,
-    }
-
-    # Handle origin (derivation path)
-    if embit_key.origin:
-        origin_components = []
-        for component in embit_key.origin.derivation:
-            is_hardened = component >= 0x80000000
-            index = component - 0x80000000 if is_hardened else component
-            origin_components.append(PathComponent(index, is_hardened))
-
-        origin_fingerprint = embit_key.origin.fingerprint
-        # Set depth to the number of components in the origin path
-        origin_depth = len(origin_components)
-        hd_dict["origin"] = Keypath(
-            origin_components,
-            origin_fingerprint,
-            origin_depth
-        )
-
-    # Add use_info for Bitcoin (type=0, network=0 for mainnet, 1 for testnet)
-    # Determine network from coin type in origin path (coin_type 0 = mainnet, 1 = testnet)
-    network = 0  # Default to mainnet
-    if embit_key.origin and len(embit_key.origin.derivation) >= 2:
-        coin_type = embit_key.origin.derivation[1]
-        # Remove hardened bit to get coin type value
-        coin_type_val = coin_type - 0x80000000 if coin_type >= 0x80000000 else coin_type
-        network = 1 if coin_type_val == 1 else 0
-
-    hd_dict["use_info"] = CoinInfo(0, network)
-
-    # Parent fingerprint
-    if hasattr(xpub, 'fingerprint'):
-        hd_dict["parent_fingerprint"] = xpub.fingerprint
-
-    return HDKey(hd_dict)
-
-
-@dataclass
-class QRCode:
-    data: str = ''
-    total_sequences: int = 0
-    sequences_count: int = 0
-    is_completed: bool = False
-    qr_type = None
-
-    def append(self, data: str):
-        self.data_init(1)
-        self.data = data
-        self.sequences_count += 1
-        self.is_completed = True
-
-    def data_init(self, sequences: int):
-        self.total_sequences = sequences
-        self.sequences_count = 0
-
-
-@dataclass
-class MultiQRCode(QRCode):
-    data_stack: list = field(default_factory=list)
-    is_init: bool = False
-    current: int = 0
-    total_sequences = None
-    qr_type = None
-    data_type = None
-    decoder = None
-    encoder = None
-
-    def step(self):
-        if self.qr_type in (qr_type.SPECTER, qr_type.BBQR):
-            self.total_sequences = len(self.data_stack)
-
-            return f"{self.current + 1}/{self.total_sequences}"
-
-        elif self.qr_type == qr_type.UR:
-            return f"{self.current + 1}/{self.total_sequences}"
-
-    def append(self, data: tuple):
-        if self.qr_type == qr_type.SPECTER:
-            self.append_specter(data)
-
-        elif self.qr_type == qr_type.UR:
-            self.append_ur(data)
-
-        elif self.qr_type == qr_type.BBQR:
-            self.append_bbqr(data)
-
-    def append_bbqr(self, data: tuple):
-        data, sequence, total_sequences = data
-
-        if not self.is_init:
-            self.data_init(total_sequences)
-            self.is_init = True
-
-        if not self.data_stack[sequence]:
-            self.data_stack[sequence] = data
-        else:
-            if data != self.data_stack[sequence]:
-                raise ValueError('Same sequences have different data!')
-        self.check_complete_bbrq()
-            
-    def check_complete_bbrq(self):
-        global bbqr_obj
+# animated codes decoded at the same time while scanning
+MAX_READ_SESSIONS = 8
 
-        fill_sequences = 0
-        for i in self.data_stack:
-            if i:
-                fill_sequences += 1
+# where unfinished scans are checkpointed, to resume them after a restart,
+# inside the user's data directory
+SESSIONS_DIR = os.path.join('SeedQReader', 'sessions')
 
-        self.sequences_count = fill_sequences
+# memory for rendered frames of repeating (Specter / BBQR) animations
+QR_FRAME_CACHE_BYTES = 128 * 1024 * 1024
 
-        if fill_sequences == self.total_sequences:
-            from bbqr import decode_bbqr
-            my_dict = {}
-            for i, val in enumerate(self.data_stack):
-                my_dict[i] = val
-            self.data = decode_bbqr(my_dict, bbqr_obj.encoding, bbqr_obj.file_type)
-            self.is_completed = True
+# frames of an animation rendered ahead of the one being shown
+QR_LOOKAHEAD_FRAMES = 4
+QR_RENDER_WORKERS = 2
 
+# shown frames the frame rate and jitter readout is measured over
+FRAME_TIMING_WINDOW = 30
 
-    def append_specter(self, data: tuple):
-        # print(f'MultiQRCode.append({data})')
-        sequence = data[0]
-        total_sequences = data[1]
-        data = data[2]
+# smallest module, in pixels, the transfer planner sizes QR codes for
+# when no qr_version is set in the config
+QR_MODULE_PX = 4
 
-        if not self.is_init:
-            self.data_init(total_sequences)
-            self.is_init = True
+# read data longer than this is shown truncated, "Save to file" writes all of it
+LARGE_DATA_CHARS = 64 * 1024
+SAVE_CHUNK_CHARS = 1024 * 1024
 
-        if not self.data_stack[sequence-1]:
-            self.data_stack[sequence-1] = data
-        else:
-            if data != self.data_stack[sequence-1]:
-                print(f"{data} != {self.data_stack[sequence-1]}")
-                raise ValueError('Same sequences have different data!')
-        self.check_complete_specter()
-
-    def append_ur(self, data: tuple):
-        if not self.decoder:
-            self.decoder = URDecoder()
-
-        self.decoder.receive_part(data)
-
-        self.check_complete_ur()
-
-    def data_init(self, sequences: int):
-        super().data_init(sequences)
-        self.data_stack = [None] * sequences
-
-    def check_complete_specter(self):
-        fill_sequences = 0
-        for i in self.data_stack:
-            if i:
-                fill_sequences += 1
-
-        self.sequences_count = fill_sequences
-
-        if fill_sequences == self.total_sequences:
-            self.is_completed = True
-            data = ''
-
-            for i in self.data_stack:
-                data += i
-            self.data = data
-
-    def check_complete_ur(self):
-        if self.decoder.is_complete():
-            if self.decoder.is_success():
-                self.is_completed = True
-                cbor = self.decoder.result_message().cbor
-                _type = self.decoder.result_message().type
-                #  XPub
-                if _type == 'crypto-account':
-                    self.data = Account.from_cbor(cbor).output_descriptors[0].descriptor()
-                #  PSBT
-                elif _type == 'crypto-psbt':
-                    self.data = UR_PSBT.from_cbor(cbor).data
-                    if type(self.data) is bytes:
-                        self.data = PSBT.parse(self.data).to_string()
-                #  Descriptor
-                elif _type == 'crypto-output':
-                    self.data = Output.from_cbor(cbor).descriptor()
-                #  bytes
-                elif _type == 'bytes':
-                    self.data = Bytes.from_cbor(cbor).data
-                    if isinstance(self.data, bytes):
-                        try:
-                            self.data = self.data.decode('utf-8')
-                        except:
-                            self.data = self.data.hex()
-                # unknown
-                else:
-                    print(f"\nUR type not yet implemented: {_type}")
-                    return
-
-                # print(f"\nUR type: {_type}")
-            # decodef fail!
-            else:
-                print("fail to complete UR parsing: ", end='')
-                print(self.decoder.result_error())
-
-    @staticmethod
-    def from_string(data, _max=MAX_LEN, type=None, format=None):
-        if (_max and len(data) > _max) or format == FORMAT_UR or format == FORMAT_BBQR:
-            out = MultiQRCode()
-            out.data = data
-
-            if format == FORMAT_UR:
-                out.qr_type = qr_type.UR
-            elif format == FORMAT_SPECTER:
-                out.qr_type = qr_type.SPECTER
-            elif format == FORMAT_BBQR:
-                out.qr_type = qr_type.BBQR
-
-            if format == FORMAT_SPECTER:
-                while len(data) > _max:
-                    sequence = data[:_max]
-                    data = data[_max:]
-                    out.data_stack.append(sequence)
-                if len(data):
-                    out.data_stack.append(data)
-
-                out.total_sequences = len(out.data_stack)
-                out.sequences_count = out.total_sequences
-                out.is_completed = True
-
-            elif format == FORMAT_BBQR:
-                from bbqr import encode_bbqr
-                try:
-                    # print(data)
-                    data_bytes = base64.b64decode(data)
-                except:
-                    print("Error executing b64decode for BBQR, will encode as utf-8")
-                    data_bytes = bytes(data, "utf-8")
-                    pass
-
-                bb = encode_bbqr(data_bytes)
-
-                if (_max < NO_SPLIT_MAX_CHARS):
-                    # adjust BBQR size from 10-500 to 23-200
-                    old_min, old_max = 10, 500
-                    new_min, new_max = 23, 100
-
-                    scaled_value = new_min + ((_max - old_min) * (new_max - new_min)) / (old_max - old_min)
-                    _max = int(round(scaled_value))
-
-                count = 1
-                for sequence, total in bb.to_qr_code(_max):
-                    out.data_stack.append(sequence)
-                    count += 1
-                    if count > total:
-                        break
-                out.total_sequences = total
-                out.sequences_count = out.total_sequences
-                out.is_completed = True
-
-                if total == 1:
-                    out.data = sequence
-
-            elif format == FORMAT_UR:
-                if not _max:
-                    _max = 100000
-
-                if type == 'PSBT':
-                    out.data_type = 'crypto-psbt'
-                    data = PSBT.from_string(data).serialize()
-                    ur = UR(out.data_type, UR_PSBT(data).to_cbor())
-                elif type == 'Descriptor':
-                    # Try to encode as crypto-output, fall back to bytes for complex descriptors
-                    try:
-                        out.data_type = 'crypto-output'
-                        output_obj = descriptor_to_output(data)
-                        ur = UR(out.data_type, output_obj.to_cbor())
-                    except Exception as e:
-                        print(f"Cannot encode as crypto-output ({e}), encoding as bytes instead")
-                        out.data_type = 'bytes'
-                        ur = UR(out.data_type, Bytes(data).to_cbor())
-                elif type == 'Key':
-                    out.data_type = 'bytes'
-                    ur = UR(out.data_type, Bytes(data).to_cbor())
-                elif type == 'Bytes':
-                    out.data_type = 'bytes'
-                    ur = UR(out.data_type, Bytes(data).to_cbor())
-                else:
-                    return
+PYZBAR_SYMBOLS = (pyzbar.ZBarSymbol.QRCODE, pyzbar.ZBarSymbol.SQCODE)
 
-                out.encoder = UREncoder(ur, _max)
-                out.total_sequences = out.encoder.fountain_encoder.seq_len()
-        else:
-            # SINGLE NORMAL QR CODE
-            out = QRCode()
-            out.data = data
-            out.data_init(1)
-
-        return out
-
-    def next(self) -> str:
-        data = None
-        if self.qr_type == qr_type.SPECTER:
-            data = self.data_stack[self.current]
-
-            digit_a = self.current + 1
-            digit_b = self.total_sequences
-
-            data = f"p{digit_a}of{digit_b} {data}"
-
-            self.current += 1
-            if self.current >= self.total_sequences:
-                self.current = 0
-        elif self.qr_type == qr_type.UR:
-            self.current = self.encoder.fountain_encoder.seq_num
-            data = self.encoder.next_part().upper()
-        elif self.qr_type == qr_type.BBQR:
-            data = self.data_stack[self.current]
-            self.current += 1
-            if self.current >= self.total_sequences:
-                self.current = 0
-        
-        return data
+sequence_reader = 0
 
 
 class ReadQR(QThread):
@@ -525,6 +101,9 @@ class ReadQR(QThread):
         self.parent = parent
         self.finished.connect(self.on_finnish)
         self.qr_data: QRCode | MultiQRCode = None
+        self.sessions = {}
+        data_dir = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.GenericDataLocation)
+        self.session_store = SessionStore(os.path.join(data_dir, SESSIONS_DIR))
         self.capture = None
         self.ecc_read = None
         self.version_read = []
@@ -534,6 +113,7 @@ class ReadQR(QThread):
 
     def run(self):
         self.qr_data: QRCode | MultiQRCode = None
+        self.sessions = {}
         self.ecc_read = None
         self.version_read = []
         self.len_read = 0
@@ -717,83 +297,130 @@ class ReadQR(QThread):
         self.version_read.append(qr.version)
         self.len_read += len(data)
 
-    def decode(self, data):
-        '''Multipart QR Code case'''
+    def parse_multipart(self, data):
+        '''Session key, QR type and part of a multipart QR Code, None for other formats'''
 
         # specter format
         if re.match(r'^p\d+of\d+\s', data, re.IGNORECASE):
 
-            if not self.qr_data:
-                self.qr_data = MultiQRCode()
-                self.qr_data.qr_type = qr_type.SPECTER
-
             header = data.split(' ')[0][1:].split('of')
             data = ' '.join(data.split(' ')[1:])
 
             digit_a = header[0]
             digit_b = header[1]
 
-            self.qr_data.append((int(digit_a), int(digit_b), data))
-
-            progress = round(self.qr_data.sequences_count / self.qr_data.total_sequences * 100)
-            self.parent.ui.read_progress.setValue(progress)
-            self.parent.ui.read_progress.setFormat(f"{self.qr_data.sequences_count}/{self.qr_data.total_sequences}")
-            self.parent.ui.read_progress.setVisible(True)
+            return ('specter', int(digit_b)), qr_type.SPECTER, (int(digit_a), int(digit_b), data)
         
         # UR format
-        elif re.match(r'^UR:', data, re.IGNORECASE):
-
-            # single/multi QR UR
-            if not self.qr_data:
-                self.qr_data = MultiQRCode()
-                self.qr_data.qr_type = qr_type.UR
-
-            self.qr_data.append(data)
-
-            try:
-                self.qr_data.total_sequences = self.qr_data.decoder.expected_part_count()
-                self.qr_data.sequences_count = len(self.qr_data.decoder.received_part_indexes())
-                progress = round(self.qr_data.sequences_count / self.qr_data.total_sequences * 100) # self.qr_data.decoder.estimated_percent_complete() * 100
-                self.parent.ui.read_progress.setValue(progress)
-                self.parent.ui.read_progress.setFormat(f"{self.qr_data.sequences_count}/{self.qr_data.total_sequences}")
-                self.parent.ui.read_progress.setVisible(True)
-            except:
-                self.qr_data.sequences_count = 0
-                self.qr_data.total_sequences = 0
-            
-
-        elif data.startswith("B$"):
-            global bbqr_obj
-            if bbqr_obj is None:
-                from bbqr import BBQrCode, KNOWN_ENCODINGS, KNOWN_FILETYPES
-
-                if data[3] in KNOWN_FILETYPES:
-                    bbqr_file_type = data[3]
-                    if data[2] in KNOWN_ENCODINGS:
-                        bbqr_encoding = data[2]
-                        bbqr_obj = BBQrCode(None, bbqr_encoding, bbqr_file_type)
+        if re.match(r'^UR:', data, re.IGNORECASE):
+            # single/multi QR UR, one session per message
+            return ('ur',) + URDecoder.message_identity(data), qr_type.UR, data
 
+        if data.startswith("B$"):
             from bbqr import parse_bbqr
 
-            parsed_data = parse_bbqr(data)
+            # the header identifies the message: encoding, file type and part count
+            return ('bbqr', data[2], data[3], data[4:6]), qr_type.BBQR, parse_bbqr(data)
 
-            if not self.qr_data:
-                self.qr_data = MultiQRCode()
-                self.qr_data.qr_type = qr_type.BBQR
+        return None
 
-            self.qr_data.append(parsed_data)
+    def decode(self, data):
+        '''Multipart QR Code case'''
+
+        multipart = self.parse_multipart(data)
 
-            progress = round(self.qr_data.sequences_count / self.qr_data.total_sequences * 100)
-            self.parent.ui.read_progress.setValue(progress)
-            self.parent.ui.read_progress.setFormat(f"{self.qr_data.sequences_count}/{self.qr_data.total_sequences}")
-            self.parent.ui.read_progress.setVisible(True)
-                
         # Other format
-        else:
+        if multipart is None:
             self.qr_data = QRCode()
             self.qr_data.append(data)
             if self.version_read:
                 self.version_read = self.version_read[-1]
+            return
+
+        key, _qr_type, part = multipart
+        session = self.get_session(key, _qr_type)
+        if self.append_part(session, part) and self.checkpointed(_qr_type):
+            # checkpoint new parts, so the scan can resume after a restart
+            self.session_store.append(key, data)
+
+        if session.is_failure():
+            # start over on the next part of this message
+            del self.sessions[key]
+            self.session_store.remove(key)
+            return
+
+        if session.is_completed:
+            self.session_store.remove(key)
+        elif session.total_sequences:
+            self.show_progress(session)
+
+    def append_part(self, session, part):
+        '''Append a part to the session, returns whether it was new'''
+        before = self.session_parts(session)
+        session.append(part)
+
+        if session.qr_type == qr_type.UR:
+            try:
+                session.total_sequences = session.decoder.expected_part_count()
+                # count independent parts, mixed ones included, not only pure fragments
+                session.sequences_count = session.decoder.rank()
+            except:
+                session.sequences_count = 0
+                session.total_sequences = 0
+
+        return self.session_parts(session) > before
+
+    @staticmethod
+    def session_parts(session):
+        if session.qr_type == qr_type.UR:
+            return len(session.decoder.processed_seq_nums) if session.decoder else 0
+        return session.sequences_count
+
+    def get_session(self, key, _qr_type):
+        '''Multipart decode session for the message identified by key, most recently used last'''
+        session = self.sessions.pop(key, None)
+        if session is None:
+            session = MultiQRCode()
+            session.qr_type = _qr_type
+            if _qr_type == qr_type.BBQR:
+                session.bbqr_encoding = key[1]
+                session.bbqr_file_type = key[2]
+            if len(self.sessions) >= MAX_READ_SESSIONS:
+                del self.sessions[next(iter(self.sessions))]
+            if self.checkpointed(_qr_type):
+                self.restore_session(session, key)
+
+        self.sessions[key] = session
+        self.qr_data = session
+        return session
+
+    @staticmethod
+    def checkpointed(_qr_type):
+        '''Only UR keys identify the content (they include its checksum): a Specter or BBQR
+        key is shared by any code with the same part count, whose parts would be mixed in'''
+        return _qr_type == qr_type.UR
+
+    def restore_session(self, session, key):
+        '''Replay the parts checkpointed by a previous scan of the same message'''
+        parts = self.session_store.load(key)
+        for data in parts:
+            try:
+                self.append_part(session, self.parse_multipart(data)[2])
+            except Exception as e:
+                print("Can't restore session part", e)
+        if parts:
+            print(f"\nRestored {session.sequences_count}/{session.total_sequences} from a previous scan")
+
+    def show_progress(self, session):
+        progress = round(session.sequences_count / session.total_sequences * 100)
+        label = f"{session.sequences_count}/{session.total_sequences}"
+        if session.qr_type == qr_type.UR:
+            # a full rank may still need more parts to peel, below 100% until decoded
+            progress = round(session.decoder.estimated_percent_complete() * 100)
+            label = f"rank {label}"
+        self.parent.ui.read_progress.setValue(progress)
+        self.parent.ui.read_progress.setFormat(label)
+        self.parent.ui.read_progress.setVisible(True)
 
     def on_finnish(self):
         if self.capture:
@@ -807,37 +434,244 @@ class ReadQR(QThread):
         self.parent.ui.camera_group.setDisabled(False)
 
 
+class FrameCache:
+    '''LRU cache of rendered QR frames, bounded by their size in bytes'''
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.frames = OrderedDict()
+        # filled from the render workers
+        self.lock = Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.frames.get(key)
+            if entry is None:
+                return None
+            self.frames.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, frame, size):
+        with self.lock:
+            if key in self.frames or size > self.max_bytes:
+                return
+            self.frames[key] = (frame, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, old_size) = self.frames.popitem(last=False)
+                self.bytes -= old_size
+
+    def clear(self):
+        with self.lock:
+            self.frames.clear()
+            self.bytes = 0
+
+
+class FrameTimer:
+    '''Measured frame rate and jitter over the last shown frames'''
+
+    def __init__(self, window=FRAME_TIMING_WINDOW):
+        self.intervals = deque(maxlen=window)
+        self.last = None
+
+    def tick(self, now):
+        if self.last is not None:
+            self.intervals.append(now - self.last)
+        self.last = now
+
+    def summary(self):
+        if not self.intervals:
+            return ''
+        mean = fmean(self.intervals)
+        jitter = pstdev(self.intervals, mean) * 1000
+        return f"{1 / mean:.1f} fps - jitter {jitter:.0f} ms"
+
+
 class DisplayQR(QThread):
     video_stream = Signal(object)
+    timing = Signal(str)
+    # encoding stage while the QR data is being built, then whether it succeeded
+    encoding = Signal(str)
+    encoded = Signal(bool)
 
     def __init__(self, parent, delay):
         QThread.__init__(self)
         self.parent = parent
         self.set_delay(delay)
         self.qr_data: QRCode | MultiQRCode = None
+        # (data, split size, data type, format, smallest) the QR data is built from
+        self.source = None
         self.stop = True
+        self.frame_cache = FrameCache(QR_FRAME_CACHE_BYTES)
+        self.render_pool = ThreadPoolExecutor(max_workers=QR_RENDER_WORKERS)
+        # next frames: (data, step text, render settings, future)
+        self.frame_queue = deque()
+        self.source_len = 0
+        self.use_cache = False
+        # QR version and mask shared by every frame of the animation, per ECC level
+        self.pinned = {}
+        self.pinned_lock = Lock()
+        self.largest_frame = ''
+        self.fixed_version = None
+        self.fixed_mask = None
 
     def set_delay(self, delay):
         self.delay = delay
 
-    def run(self):
+    def generate(self, data, _max, type, format, smallest):
+        '''Encode the data and show it, both off the GUI thread'''
+        self.source = (data, _max, type, format, smallest)
+        self.qr_data = None
         self.stop = False
+        self.start()
+
+    def encode_source(self):
+        '''Build the QR data from the source, returns whether it is ready to be shown'''
+        data, _max, type, format, smallest = self.source
+        try:
+            self.qr_data = MultiQRCode.from_string(data, _max=_max, type=type, format=format, smallest=smallest,
+                                                   progress=self.encoding_progress, level=self.ecc_level())
+        except GenerateCancelled:
+            return False
+        except Exception as e:
+            print("error creating MultiQRCode", format, e)
+            self.qr_data = None
+
+        if self.stop:
+            return False
+        if not self.qr_data:
+            print("error creating MultiQRCode")
+            self.encoded.emit(False)
+            return False
+
+        self.encoding.emit('')
+        self.encoded.emit(True)
+        return True
+
+    def encoding_progress(self, stage):
+        if self.stop:
+            raise GenerateCancelled()
+        self.encoding.emit(f"{stage}...")
+
+    def prepare_animation(self):
+        '''Settings that stay the same for every frame of the animation'''
+        self.source_len = len(self.source[0])
+
+        # UR frames never repeat, caching them would only evict the others
+        self.use_cache = self.qr_data.qr_type != qr_type.UR
+
+        # version and mask are chosen once, from the largest frame, unless set in the config
+        self.pinned = {}
+        self.largest_frame = self.qr_data.largest_frame()
+        self.fixed_version = self.config_number('qr_version', 1, 40)
+        self.fixed_mask = self.config_number('qr_mask', 0, 7)
+
+    def config_number(self, key, low, high):
+        value = self.parent.config.get(key)
+        if value is None:
+            return None
+        if not isinstance(value, int) or not low <= value <= high:
+            print(f"Ignoring config {key}: {value}, expected a number from {low} to {high}")
+            return None
+        return value
+
+    def pinned_qr(self, level):
+        '''QR version and mask pattern used for every frame with the given ECC level'''
+        with self.pinned_lock:
+            if level not in self.pinned:
+                self.pinned[level] = fit_qr(self.largest_frame, level, self.fixed_version, self.fixed_mask)
+            return self.pinned[level]
+
+    def ecc_level(self):
+        level = qrcode.constants.ERROR_CORRECT_L
+        if self.parent.error_correction == ECC_M:
+            level = qrcode.constants.ERROR_CORRECT_M
+        elif self.parent.error_correction == ECC_Q:
+            level = qrcode.constants.ERROR_CORRECT_Q
+        elif self.parent.error_correction == ECC_H:
+            level = qrcode.constants.ERROR_CORRECT_H
+        return level
+
+    def render_settings(self):
+        '''Settings a rendered frame depends on: ECC level, inversion and target size'''
+        size = self.parent.ui.video_out.size()
+        return (self.ecc_level(), self.parent.ui.inverted.isChecked(), size.width(), size.height())
+
+    def fill_frame_queue(self, settings):
+        '''Generate the next frames and render them ahead on the worker pool'''
+        while len(self.frame_queue) < QR_LOOKAHEAD_FRAMES:
+            if self.qr_data.qr_type == qr_type.UR:
+                data = self.qr_data.next()
+                step = self.qr_data.step()
+            else:
+                step = self.qr_data.step()
+                data = self.qr_data.next()
+            future = self.render_pool.submit(self.get_frame, data, settings)
+            self.frame_queue.append((data, step, settings, future))
+
+    def invalidate_frame_queue(self, settings):
+        '''Render the queued frames again with new settings'''
+        queue = self.frame_queue
+        self.frame_queue = deque()
+        for data, step, _, future in queue:
+            future.cancel()
+            self.frame_queue.append((data, step, settings, self.render_pool.submit(self.get_frame, data, settings)))
+
+    def sleep_until(self, deadline):
+        remaining = deadline - time.monotonic()
+        if remaining > 0:
+            self.msleep(round(remaining * 1000))
+
+    def clear_frame_queue(self):
+        for _, _, _, future in self.frame_queue:
+            future.cancel()
+        self.frame_queue.clear()
+
+    def run(self):
+        if not self.encode_source():
+            return
+        self.prepare_animation()
         if self.qr_data.total_sequences > 1 or self.qr_data.qr_type == qr_type.UR:
             remove_qr = True
             firstFrame = True
+            timer = FrameTimer()
+            deadline = time.monotonic()
             while not self.stop:
-                self.parent.ui.steps.setText(self.qr_data.step())
-                data = self.qr_data.next()
-                if self.qr_data.qr_type == qr_type.UR:
-                    self.parent.ui.steps.setText(self.qr_data.step())
-                self.display_qr(data)
-                self.msleep(self.delay)
+                settings = self.render_settings()
+                if self.frame_queue and self.frame_queue[0][2] != settings:
+                    self.invalidate_frame_queue(settings)
+                self.fill_frame_queue(settings)
+
+                data, step, _, future = self.frame_queue.popleft()
+                frame = future.result()
+
+                # frames are shown on deadlines, the period doesn't include render time
+                self.sleep_until(deadline)
+                if self.stop:
+                    break
+                self.parent.ui.steps.setText(step)
+                self.show_frame(frame)
+                now = time.monotonic()
+                if not firstFrame:
+                    timer.tick(now)
+                    self.timing.emit(timer.summary())
+
+                # refill in the background while the frame is shown
+                self.fill_frame_queue(settings)
                 if self.qr_data.total_sequences == 1:
                     remove_qr = False
                     break
+
+                deadline += self.delay / 1000
                 if firstFrame:
                     firstFrame = False
-                    self.msleep(ANIMATED_QR_FIRST_FRAME_DELAY)
+                    deadline += ANIMATED_QR_FIRST_FRAME_DELAY / 1000
+                # fell behind (slow render or busy machine): don't rush to catch up
+                if deadline < now:
+                    deadline = now
+            self.clear_frame_queue()
+            self.timing.emit('')
             if remove_qr:
                 self.video_stream.emit(None)
         elif self.qr_data.total_sequences == 1:
@@ -854,41 +688,46 @@ class DisplayQR(QThread):
         return "kanji"
 
     def display_qr(self, data):
+        self.show_frame(self.get_frame(data, self.render_settings()))
+
+    def show_frame(self, frame):
+        if frame is None:
+            return
+        image, info = frame
+        self.parent.ui.info_send.setText(info)
+        self.video_stream.emit(image)
+
+    def get_frame(self, data, settings):
+        '''Rendered QR image and info text, from the cache when possible'''
         try:
-            level = qrcode.constants.ERROR_CORRECT_L
-            if self.parent.error_correction == ECC_M:
-                level = qrcode.constants.ERROR_CORRECT_M
-            elif self.parent.error_correction == ECC_Q:
-                level = qrcode.constants.ERROR_CORRECT_Q
-            elif self.parent.error_correction == ECC_H:
-                level = qrcode.constants.ERROR_CORRECT_H
-
-            qr = qrcode.QRCode(error_correction=level)
-            qr.add_data(data)
-            qr.make(fit=False)
-            modes = set()
-            for element in qr.data_list:
-                modes.add(self.mode_to_str(element.mode))
-            original_data: str = self.parent.ui.data_out.toPlainText()
-            original_data.replace(' ', '').replace('\n', '')
-            self.parent.ui.info_send.setText(f"Version {qr.version} - {len(data)} chars ({', '.join(modes)}) - Source: {len(original_data)} chars")
-            img = qr.make_image()
-            pil_image = img.convert("RGB")
-            qimage = ImageQt.ImageQt(pil_image)
-
-            # invert QR colors
-            if self.parent.ui.inverted.isChecked():
-                qimage.invertPixels() 
-
-            qimage = qimage.convertToFormat(QImage.Format_RGB888)
-
-            # Create a QPixmap from the QImage
-            pixmap = QPixmap.fromImage(qimage)
-
-            scaled_pixmap = pixmap.scaled(self.parent.ui.video_out.size(), Qt.KeepAspectRatio)
-            self.video_stream.emit(scaled_pixmap)
+            key = (data,) + settings + self.pinned_qr(settings[0])
+
+            frame = self.frame_cache.get(key) if self.use_cache else None
+            if frame is None:
+                frame = self.render_qr(data, settings)
+                if self.use_cache:
+                    self.frame_cache.put(key, frame, frame[0].sizeInBytes())
+            return frame
         except Exception as e:
             print("error making QR", e)
+            return None
+
+    def render_qr(self, data, settings):
+        '''Scaled image of the QR Code and its info text'''
+        level, inverted, width, height = settings
+        qr = make_qr(data, level, *self.pinned_qr(level))
+        modes = set()
+        for element in qr.data_list:
+            modes.add(self.mode_to_str(element.mode))
+        info = f"Version {qr.version} - {len(data)} chars ({', '.join(modes)}) - Source: {self.source_len} chars"
+        # straight from the module matrix to a grayscale image, without PIL
+        pixels = qr_pixels(qr.modules, qr.border, min(width, height), inverted)
+        side = pixels.shape[0]
+        image = QImage(pixels.data, side, side, side, QImage.Format_Grayscale8)
+
+        # Ensure the data is not garbage-collected
+        image.ndarray = pixels
+        return image, info
 
 
 class MainWindow(QMainWindow):
@@ -925,6 +764,7 @@ class MainWindow(QMainWindow):
         self.ui.data_in.setFont(font)
         self.ui.steps.setFont(font)
         self.ui.info_send.setFont(font)
+        self.ui.frame_timing.setFont(font)
         self.ui.info_read.setFont(font)
         self.ui.data_out.setWordWrapMode(QTextOption.WrapAnywhere)
         self.ui.data_in.setWordWrapMode(QTextOption.WrapAnywhere)
@@ -952,6 +792,10 @@ class MainWindow(QMainWindow):
         self.on_radio_toggled()
 
         self.ui.btn_save.clicked.connect(self.on_btn_save)
+        self.ui.btn_save_read.clicked.connect(self.on_btn_save_read)
+        self.ui.btn_save_read.setDisabled(True)
+        self.data_read = None
+        self.ui.btn_plan.clicked.connect(self.on_btn_plan)
 
         self.ui.combo_format.addItems([FORMAT_SPECTER, FORMAT_UR, FORMAT_BBQR])
         self.format = self.ui.combo_format.currentText()
@@ -994,6 +838,10 @@ class MainWindow(QMainWindow):
 
         self.display_qr = DisplayQR(self, self.ui.delay_slider.value())
         self.display_qr.video_stream.connect(self.on_qr_display)
+        self.display_qr.timing.connect(self.ui.frame_timing.setText)
+        self.display_qr.encoding.connect(self.ui.steps.setText)
+        self.display_qr.encoded.connect(self.on_qr_encoded)
+        self.display_qr.finished.connect(self.reset_generate)
 
     def load_config(self):
         if not os.path.exists('config'):
@@ -1099,6 +947,8 @@ class MainWindow(QMainWindow):
             frame.fill(QColor(FILL_COLOR))
             self.ui.info_send.setText('')
             self.ui.steps.setText('')
+        elif isinstance(frame, QImage):
+            frame = QPixmap.fromImage(frame)
         
         self.ui.video_out.setPixmap(frame)
 
@@ -1115,16 +965,17 @@ class MainWindow(QMainWindow):
             self.read_qr.end = False
             self.ui.data_in.setPlainText('')
             self.ui.info_read.setPlainText('')
+            self.data_read = None
+            self.ui.btn_save_read.setDisabled(True)
             self.read_qr.start()
         else:
             self.read_qr.end = True
             self.ecc_read = None
             self.version_read = []
 
-    def is_alnum(self, c):
-        return ("A" <= c <= "Z") or ("0" <= c <= "9") or c in (" $%*+-./:")
-
     def on_qr_data_read(self, data):
+        # raw bytes are saved as they were read, not as the text shown
+        self.data_read = data
         if isinstance(data, bytes):
             try:
                 data = data.decode("utf-8")
@@ -1135,15 +986,20 @@ class MainWindow(QMainWindow):
                 except Exception as e:
                     print("Could not identify data", e)
                 
-        self.ui.data_in.setPlainText(data)
+        summary = ''
+        if len(data) > LARGE_DATA_CHARS:
+            # the text box gets slow with megabytes of text, show the start only
+            self.ui.data_in.setPlainText(f"{data[:LARGE_DATA_CHARS]}\n\n[{len(data) - LARGE_DATA_CHARS} more chars, "
+                                         "use Save to file to get all of it]")
+            summary = f"\n{self.data_summary()}"
+        else:
+            self.ui.data_in.setPlainText(data)
+        self.ui.btn_save_read.setDisabled(False)
         print("\n"*2 + "-" *120 + "\n"*4)
 
         mode = 'byte'
         if not isinstance(data, bytes):
-            if all(("0" <= c <= "9") for c in data):
-                mode = 'numeric'
-            elif all(self.is_alnum(c) for c in data):
-                mode = 'alphanumeric'
+            mode = self.display_qr.mode_to_str(data_mode(data))
         
         ecc = ''
         if self.read_qr.ecc_read:
@@ -1153,7 +1009,57 @@ class MainWindow(QMainWindow):
 
             ecc = f"QR: Estimated Version {ver} ({self.read_qr.ecc_read}) {self.read_qr.len_read} chars "
         
-        self.ui.info_read.setPlainText(f"{ecc}({mode}) - Parsed str data: {len(data)} chars")
+        self.ui.info_read.setPlainText(f"{ecc}({mode}) - Parsed str data: {len(data)} chars{summary}{self.ur_metrics_info()}")
+
+    def data_summary(self):
+        '''Size, kind and hash of the read data'''
+        data = self.data_read
+        if isinstance(data, bytes):
+            kind = 'PSBT binary' if data.startswith(b'psbt\xff') else 'binary'
+            digest = hashlib.sha256(data)
+        else:
+            if data.startswith('cHNidP'):
+                kind = 'PSBT base64'
+            elif data[:10].lower() == '70736274ff':
+                kind = 'PSBT hex'
+            elif re.fullmatch(r'[0-9a-fA-F]+', data):
+                kind = 'hex'
+            else:
+                kind = 'text'
+            digest = hashlib.sha256()
+            for i in range(0, len(data), SAVE_CHUNK_CHARS):
+                digest.update(data[i:i + SAVE_CHUNK_CHARS].encode('utf-8'))
+        return f"{kind} - {len(data)} {'bytes' if isinstance(data, bytes) else 'chars'} - sha256 {digest.hexdigest()[:16]}"
+
+    def on_btn_save_read(self):
+        '''Write all the read data to a file, in chunks so large data isn't copied at once'''
+        if self.data_read is None:
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Save read data")
+        if not path:
+            return
+
+        data = self.data_read
+        with open(path, 'wb') as f:
+            if isinstance(data, bytes):
+                f.write(data)
+            else:
+                for i in range(0, len(data), SAVE_CHUNK_CHARS):
+                    f.write(data[i:i + SAVE_CHUNK_CHARS].encode('utf-8'))
+
+    def ur_metrics_info(self):
+        qr_data = self.read_qr.qr_data
+        if not isinstance(qr_data, MultiQRCode) or not qr_data.decoder:
+            return ''
+
+        m = qr_data.decoder.metrics()
+        info = (f"\nUR: {m['received_parts']} parts ({m['duplicate_parts']} duplicate, {m['useless_parts']} redundant)"
+                f" - rank {m['rank']}/{m['expected_part_count']} - {m['mixed_parts']} mixed pending")
+        if m['evicted_parts']:
+            info += f" - {m['evicted_parts']} evicted"
+        if m['decode_seconds'] is not None:
+            info += f" - {m['decode_seconds']:.1f}s"
+        return info
 
     def upd_camera_stream(self, frame):
         if frame is None:
@@ -1192,35 +1098,87 @@ class MainWindow(QMainWindow):
         if not self.display_qr.isRunning() and self.display_qr.stop and data != '':
             _max = NO_SPLIT_MAX_CHARS if self.ui.no_split.isChecked() else self.ui.send_slider.value()
 
-            try:
-                qr = MultiQRCode.from_string(data, _max=_max, type=self.data_type, format=self.format)
-            except Exception as e:
-                print("error creating MultiQRCode", self.format, e)
-                return
-            
-            if not qr:
-                print("error creating MultiQRCode")
-                return
-            
+            # encoding large payloads takes a while, it runs on the display thread
             self.ui.split_group.setDisabled(True)
-            self.display_qr.qr_data = qr
-            self.display_qr.start()
+            self.display_qr.generate(data, _max, self.data_type, self.format,
+                                     bool(self.config.get('bbqr_smallest_output')))
 
-            self.ui.btn_generate.setText(STOP_QR_TXT)
+            self.ui.btn_generate.setText(CANCEL_GENERATE_TXT)
             self.updateDisableQRCombo()
         else:
             self.display_qr.stop = True
             self.display_qr.video_stream.emit(None)
+            if self.display_qr.isRunning():
+                # a stage that is encoding (deflate, PSBT parsing...) runs to its end,
+                # the button is back once the thread has finished
+                self.ui.btn_generate.setText(CANCELLING_TXT)
+                self.ui.btn_generate.setDisabled(True)
+            else:
+                self.reset_generate()
 
-            self.ui.split_group.setDisabled(False)
-            self.ui.btn_generate.setText(GENERATE_TXT)
-            self.updateDisableQRCombo()
+    def on_qr_encoded(self, success):
+        if self.display_qr.stop:
+            return
+        if success:
+            self.ui.btn_generate.setText(STOP_QR_TXT)
+        else:
+            self.display_qr.stop = True
+            self.ui.steps.setText('')
+            self.reset_generate()
+
+    def reset_generate(self):
+        self.ui.split_group.setDisabled(False)
+        self.ui.btn_generate.setText(GENERATE_TXT)
+        self.ui.btn_generate.setDisabled(False)
+        self.updateDisableQRCombo()
+
+    def on_btn_plan(self):
+        '''Pick the format and split size that send the data in the shortest time'''
+        data = self.ui.data_out.toPlainText()
+        if data == '' or self.display_qr.isRunning():
+            return
+
+        version = self.display_qr.config_number('qr_version', 1, 40)
+        if version is None:
+            module_px = self.display_qr.config_number('qr_module_px', 1, 100) or QR_MODULE_PX
+            size = self.ui.video_out.size()
+            version = version_for_size(min(size.width(), size.height()), module_px)
+
+        try:
+            ur = MultiQRCode.ur_from_string(data, self.ui.combo_type.currentText())
+        except Exception as e:
+            print("Cannot plan UR", e)
+            ur = None
+
+        plans = plan_transfer(version, self.display_qr.ecc_level(), self.ui.delay_slider.value(),
+                              data=data, ur=ur, bbqr_data=MultiQRCode.bbqr_bytes(data),
+                              max_split=self.ui.send_slider.maximum())
+        if not plans:
+            self.ui.info_send.setText(f"Data doesn't fit QR version {version}")
+            return
+
+        print(f"Transfer plans for QR version {version} ({self.error_correction}):")
+        for plan in plans:
+            print(f"  {plan.describe()}")
+
+        best = plans[0]
+        if best.qr_type == qr_type.UR:
+            self.ui.combo_format.setCurrentText(FORMAT_UR)
+        elif best.qr_type == qr_type.BBQR:
+            self.ui.combo_format.setCurrentText(FORMAT_BBQR)
+        else:
+            self.ui.combo_format.setCurrentText(FORMAT_SPECTER)
+
+        self.ui.no_split.setChecked(best.frames == 1)
+        if best.frames > 1:
+            self.ui.send_slider.setValue(best.split)
+        self.ui.info_send.setText(f"Version {version} - {best.describe()}")
 
     def on_btn_clear(self):
         self.ui.data_out.setPlainText('')
 
     def updateDisableQRCombo(self):
-        disable = self.ui.btn_generate.text() == STOP_QR_TXT
+        disable = self.ui.btn_generate.text() in (STOP_QR_TXT, CANCEL_GENERATE_TXT, CANCELLING_TXT)
         self.ui.combo_error.setDisabled(disable)
         self.ui.combo_format.setDisabled(disable)
         if self.format != FORMAT_BBQR:
@@ -1302,6 +1260,9 @@ class MainWindow(QMainWindow):
 
 
 if __name__ == '__main__':
+    # BBQR compression search runs on a process pool, also in frozen builds
+    multiprocessing.freeze_support()
+
     # the QUiLoader object needs to be initialized BEFORE the QApplication - https://stackoverflow.com/a/78041695
     loader = QUiLoader()
     app = QApplication(sys.argv)
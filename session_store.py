@@ -0,0 +1,74 @@
+import os
+import json
+import time
+import hashlib
+
+
+class SessionStore:
+    """Append-only on-disk checkpoints of multipart scan sessions.
+
+    Each session is a file named after its message identity, holding one
+    JSON string per received part, so a scan can be resumed by replaying them.
+    Keys must identify the message content, or the parts of another message
+    with the same key would be replayed into it.
+    Parts may be PSBTs or descriptors: the directory is only created once a
+    part is written, and only the current user can read it.
+    """
+
+    def __init__(self, directory, max_age_days=7):
+        self.directory = directory
+        self.prune(max_age_days * 24 * 3600)
+
+    def path(self, key):
+        name = hashlib.sha256(repr(key).encode()).hexdigest()[:32]
+        return os.path.join(self.directory, name)
+
+    def load(self, key):
+        """Parts received so far for the session, oldest first"""
+        try:
+            with open(self.path(key), 'r') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return []
+
+        parts = []
+        for line in lines:
+            try:
+                parts.append(json.loads(line))
+            except ValueError:
+                # a line left incomplete by a crash, the parts after it are fine
+                continue
+        return parts
+
+    def append(self, key, data):
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        line = json.dumps(data).encode() + b'\n'
+        fd = os.open(self.path(key), os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o600)
+        with os.fdopen(fd, 'a+b') as f:
+            # terminate a line left incomplete by a crash, instead of appending to it
+            if f.seek(0, os.SEEK_END):
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    line = b'\n' + line
+            f.write(line)
+
+    def remove(self, key):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def prune(self, max_age):
+        """Remove sessions not updated for max_age seconds"""
+        now = time.time()
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                if now - os.path.getmtime(path) > max_age:
+                    os.remove(path)
+            except OSError:
+                pass
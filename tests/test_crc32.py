@@ -0,0 +1,22 @@
+import random
+
+import pytest
+
+from foundation.crc32 import crc32, crc32_table, crc32n
+
+
+@pytest.mark.parametrize("size", (0, 1, 2, 3, 4, 7, 64, 1000, 4096, 65537))
+def test_crc32_matches_table(size):
+    data = random.Random(size).randbytes(size)
+    assert crc32(data) == crc32_table(data)
+
+
+def test_crc32_accepts_bytearray_and_memoryview():
+    data = bytearray(random.Random(0).randbytes(513))
+    assert crc32(data) == crc32(memoryview(data)) == crc32_table(data)
+
+
+def test_crc32_known_values():
+    assert crc32(b"") == 0
+    assert crc32(b"Hello, world!") == 0xebe6c6e6
+    assert crc32n(b"Wolf") == bytes.fromhex("598c84dc")
@@ -0,0 +1,47 @@
+import random
+
+import pytest
+
+from foundation.fountain_utils import shuffled, shuffled_prefix, choose_degree, choose_fragments
+from foundation.utils import int_to_bytes
+from foundation.xoshiro256 import Xoshiro256
+
+SIZES = (1, 2, 3, 5, 10, 17, 64, 100, 257, 1000, 3000)
+
+
+def reference_fragments(seq_num, seq_len, checksum):
+    """choose_fragments as it was, shuffling the whole index list"""
+    if seq_num <= seq_len:
+        return frozenset([seq_num - 1])
+    rng = Xoshiro256.from_bytes(int_to_bytes(seq_num) + int_to_bytes(checksum))
+    degree = choose_degree(seq_len, rng)
+    return frozenset(shuffled(list(range(seq_len)), rng)[:degree])
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_shuffled_prefix_matches_shuffled(n):
+    seeds = random.Random(n)
+    for _ in range(50):
+        seed = seeds.randbytes(8)
+        # both branches: mapping through the taken items and popping from the list
+        for count in {1, min(n, 3), n // 2 or 1, n}:
+            expected = shuffled(list(range(n)), Xoshiro256.from_bytes(seed))[:count]
+            assert shuffled_prefix(n, count, Xoshiro256.from_bytes(seed)) == expected
+
+
+def test_shuffled_prefix_consumes_the_same_numbers():
+    seed = b"shuffled_prefix"
+    reference, rng = Xoshiro256.from_bytes(seed), Xoshiro256.from_bytes(seed)
+    for i in range(5):
+        reference.next_int(0, 99 - i)
+    shuffled_prefix(100, 5, rng)
+    assert rng.next() == reference.next()
+
+
+@pytest.mark.parametrize("seq_len", SIZES)
+def test_choose_fragments_matches_reference(seq_len):
+    seeds = random.Random(seq_len)
+    for _ in range(100):
+        checksum = seeds.getrandbits(32)
+        seq_num = seeds.randint(1, 4 * seq_len + 100)
+        assert choose_fragments(seq_num, seq_len, checksum) == reference_fragments(seq_num, seq_len, checksum)
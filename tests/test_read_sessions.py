@@ -0,0 +1,82 @@
+import base64
+import random
+from unittest.mock import MagicMock
+
+import pytest
+
+# the GUI needs PySide6 and the zbar shared library
+seedqreader = pytest.importorskip("seedqreader", exc_type=ImportError)
+
+from qr_code import MultiQRCode, FORMAT_SPECTER, FORMAT_UR, FORMAT_BBQR
+from session_store import SessionStore
+
+
+def payload(seed):
+    return base64.b64encode(random.Random(seed).randbytes(600)).decode()
+
+
+def decoded(data, format):
+    """What a completed scan holds: BBQR is sent as the base64-decoded bytes"""
+    return base64.b64decode(data) if format == FORMAT_BBQR else data
+
+
+def frames(data, format, split):
+    qr_data = MultiQRCode.from_string(data, _max=split, format=format)
+    return [qr_data.next() for _ in range(qr_data.total_sequences)]
+
+
+def reader(directory):
+    read = seedqreader.ReadQR(MagicMock())
+    read.session_store = SessionStore(directory)
+    return read
+
+
+@pytest.mark.parametrize("format, split", ((FORMAT_SPECTER, 200), (FORMAT_BBQR, 300)))
+def test_conflicting_code_with_the_same_key_resets_the_session(tmp_path, format, split):
+    a, b = payload(1), payload(2)
+    frames_a, frames_b = frames(a, format, split), frames(b, format, split)
+    assert len(frames_a) == len(frames_b)
+
+    read = reader(tmp_path)
+    read.decode(frames_a[0])
+    # same slot, different data: the session is dropped instead of raising
+    read.decode(frames_b[0])
+    assert not read.sessions
+
+    for frame in frames_b:
+        read.decode(frame)
+    assert read.qr_data.is_completed
+    assert read.qr_data.data == decoded(b, format)
+
+
+@pytest.mark.parametrize("format, split", ((FORMAT_SPECTER, 200), (FORMAT_BBQR, 300)))
+def test_unfinished_scan_is_not_replayed_into_another_code(tmp_path, format, split):
+    a, b = payload(1), payload(2)
+    frames_a, frames_b = frames(a, format, split), frames(b, format, split)
+
+    read = reader(tmp_path)
+    for frame in frames_a[:3]:
+        read.decode(frame)
+
+    # a new scan, or an app restart, with the same store
+    read = reader(tmp_path)
+    for frame in frames_b:
+        read.decode(frame)
+    assert read.qr_data.is_completed
+    assert read.qr_data.data == decoded(b, format)
+
+
+def test_unfinished_ur_scan_is_resumed(tmp_path):
+    a = payload(1)
+    qr_data = MultiQRCode.from_string(a, _max=100, type="Bytes", format=FORMAT_UR)
+    parts = [qr_data.next() for _ in range(qr_data.total_sequences)]
+
+    read = reader(tmp_path)
+    for part in parts[:3]:
+        read.decode(part)
+
+    read = reader(tmp_path)
+    for part in parts[3:]:
+        read.decode(part)
+    assert read.qr_data.is_completed
+    assert read.qr_data.data == a
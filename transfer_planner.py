@@ -0,0 +1,155 @@
+import math
+from dataclasses import dataclass
+
+from qrcode.util import BIT_LIMIT_TABLE, MODE_NUMBER, MODE_ALPHA_NUM, MODE_8BIT_BYTE, length_in_bits, optimal_mode
+
+import qr_type
+from bbqr import BBQR_PREFIX_LENGTH, encode_bbqr
+
+from foundation.ur_encoder import UREncoder
+from foundation.fountain_encoder import FountainEncoder, Part as FountainPart
+
+# UR frames are sized for sequence numbers up to this (the largest one that
+# still fits in 3 CBOR bytes), so the pinned version lasts the whole animation
+UR_LARGEST_SEQ_NUM = 0xffff
+
+# UREncoder default, fragments are never shorter than this
+UR_MIN_FRAGMENT_LEN = 10
+
+# quiet zone around every rendered QR, in modules
+QR_BORDER = 4
+
+
+def qr_capacity(version, level, mode):
+    """Characters a single-segment QR of the given version, ECC level and mode can hold"""
+    bits = BIT_LIMIT_TABLE[level][version] - 4 - length_in_bits(mode, version)
+    if mode == MODE_NUMBER:
+        # 10 bits per 3 digits, 7 for the last 2, 4 for the last 1
+        return bits // 10 * 3 + (2 if bits % 10 >= 7 else 1 if bits % 10 >= 4 else 0)
+    if mode == MODE_ALPHA_NUM:
+        # 11 bits per 2 characters, 6 for the last 1
+        return bits // 11 * 2 + (1 if bits % 11 >= 6 else 0)
+    return bits // 8
+
+
+def data_mode(data):
+    """Densest QR mode able to hold all of data"""
+    return optimal_mode(data.encode("utf-8"))
+
+
+def version_for_size(size, module_px, border=QR_BORDER):
+    """Largest QR version drawn with modules of at least module_px pixels in size x size pixels"""
+    modules = size // module_px - 2 * border
+    return max(1, min(40, (modules - 17) // 4))
+
+
+@dataclass
+class TransferPlan:
+    qr_type: str
+    # BBQR encoding, None for the other formats
+    encoding: str
+    # split size as MultiQRCode.from_string takes it: characters per part
+    # for Specter and BBQR, fragment bytes for UR
+    split: int
+    frames: int
+    frame_len: int
+    seconds: float
+
+    def describe(self):
+        name = self.qr_type.upper() + (f" {self.encoding}" if self.encoding else "")
+        return f"{name}: {self.frames} frames of {self.frame_len} chars, split {self.split}, {self.seconds:.1f}s"
+
+
+def plan_specter(data, version, level, max_split):
+    """Specter frames are sized in byte mode, "pMofN " is never alphanumeric"""
+    if len(data) <= qr_capacity(version, level, data_mode(data)):
+        return 1, len(data), len(data)
+
+    capacity = qr_capacity(version, level, MODE_8BIT_BYTE)
+    frames = 1
+    while True:
+        prefix = len(f"p{frames}of{frames} ")
+        split = min(capacity - prefix, max_split)
+        if split < 1:
+            return None
+        needed = math.ceil(len(data) / split)
+        if needed <= frames:
+            return frames, split, split + prefix
+        frames = needed
+
+
+def plan_bbqr(bb, version, level, max_split):
+    capacity = min(qr_capacity(version, level, MODE_ALPHA_NUM), max_split + BBQR_PREFIX_LENGTH)
+    if capacity - BBQR_PREFIX_LENGTH < 8:
+        return None
+    frames, part_size = bb.find_min_num_parts(capacity)
+    return frames, capacity - BBQR_PREFIX_LENGTH, part_size + BBQR_PREFIX_LENGTH
+
+
+def ur_frame_len(ur, fragment_len):
+    """Length of the longest frame of a UR split in fragments of up to fragment_len bytes, and their count"""
+    message_len = len(ur.cbor)
+    fragment_len = FountainEncoder.find_nominal_fragment_length(message_len, UR_MIN_FRAGMENT_LEN, fragment_len)
+    seq_len = math.ceil(message_len / fragment_len)
+    part = FountainPart(UR_LARGEST_SEQ_NUM, seq_len, message_len, 0xffffffff, bytes(fragment_len))
+    return len(UREncoder.encode_part(ur.type, part)), seq_len
+
+
+def plan_ur(ur, version, level, max_split):
+    capacity = qr_capacity(version, level, MODE_ALPHA_NUM)
+    single = len(UREncoder.encode(ur))
+    if single <= capacity:
+        return 1, len(ur.cbor), single
+
+    # frames grow with the fragment length, find the longest one that fits
+    low, high = UR_MIN_FRAGMENT_LEN, min(len(ur.cbor), max_split)
+    if low > high or ur_frame_len(ur, low)[0] > capacity:
+        return None
+    while low < high:
+        middle = (low + high + 1) // 2
+        if ur_frame_len(ur, middle)[0] <= capacity:
+            low = middle
+        else:
+            high = middle - 1
+    frame_len, frames = ur_frame_len(ur, low)
+    return frames, low, frame_len
+
+
+def plan_transfer(version, level, delay, data=None, ur=None, bbqr_data=None, max_split=None):
+    """Frame count and transfer time of every format able to send the payload
+    with QR codes of at most the given version and ECC level, fastest first.
+
+    data is the text sent as Specter, ur the UR message and bbqr_data the
+    bytes sent as BBQR; formats without a payload are left out. delay is the
+    time each frame is shown, in ms. Splits are capped at max_split, unless
+    the payload fits in a single frame.
+    """
+    max_split = max_split or math.inf
+    candidates = []
+    if data is not None:
+        candidates.append((qr_type.SPECTER, None, lambda: plan_specter(data, version, level, max_split)))
+    if ur is not None:
+        candidates.append((qr_type.UR, None, lambda: plan_ur(ur, version, level, max_split)))
+    if bbqr_data is not None:
+        encoded = {}
+        for encoding in ("H", "2", "Z"):
+            bb = encode_bbqr(bbqr_data, encoding)
+            # "Z" falls back to "2" when compression doesn't help
+            encoded.setdefault(bb.encoding, bb)
+        for encoding, bb in encoded.items():
+            candidates.append((qr_type.BBQR, encoding, lambda bb=bb: plan_bbqr(bb, version, level, max_split)))
+
+    plans = []
+    for _type, encoding, plan in candidates:
+        try:
+            result = plan()
+        except ValueError:
+            # too many parts for the format
+            continue
+        if result is None:
+            continue
+        frames, split, frame_len = result
+        plans.append(TransferPlan(_type, encoding, split, frames, frame_len, frames * delay / 1000))
+
+    plans.sort(key=lambda p: (p.seconds, p.frame_len))
+    return plans